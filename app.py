@@ -1,26 +1,135 @@
-from flask import Flask, render_template, jsonify, send_from_directory
+from flask import Flask, render_template, jsonify, send_from_directory, request, Response, g
 import psutil
+import numpy as np
+from werkzeug.serving import WSGIRequestHandler
 import platform
 import time
 import logging
+import logging.handlers
+import queue
 import subprocess
 import os
-import re
 import datetime
-from collections import defaultdict
+import threading
+import shutil
+import glob
+import atexit
+import re
+import sqlite3
+import json
+import heapq
+import bisect
+import math
+import gzip
+import hashlib
+import hmac
+import zlib
+import socket
+import signal
+import argparse
+import http.client
+import urllib.parse
+import concurrent.futures
+import struct
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+import cProfile
+import marshal
+import sys
+from collections import defaultdict, namedtuple, deque, OrderedDict
+
+# Handler antrian tanpa blocking: jika listener tertinggal, record dibuang dan dihitung
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Hanya pesan yang dirender di thread pemanggil; Formatter dan traceback dirender di thread listener
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# Warning/error yang sama persis hanya dicatat sekali per interval; pengulangan diringkas saat muncul lagi
+class DedupFilter(logging.Filter):
+    def __init__(self, interval=60.0, level=logging.WARNING, max_keys=1000):
+        super().__init__()
+        self.interval = interval
+        self.level = level
+        self.max_keys = max_keys
+        self.suppressed = 0
+        self._seen = {} # (logger, level, pesan) -> [waktu dicatat, jumlah ditekan]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < self.level:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is not None and now - entry[0] < self.interval:
+                entry[1] += 1
+                self.suppressed += 1
+                return False
+            repeats = entry[1] if entry is not None else 0
+            if len(self._seen) >= self.max_keys:
+                self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.interval}
+            self._seen[key] = [now, 0]
+        if repeats:
+            record.msg, record.args = f"{record.getMessage()} (diulang {repeats}x dalam {self.interval:.0f}s terakhir)", None
+        return True
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, 
-                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
+
+# Setup logging: semua record lewat antrian ke satu thread listener; level per subsistem dari
+# MONITOR_LOG_LEVEL (default INFO) dan MONITOR_LOG_LEVELS, mis. "monitor.gpu=DEBUG,werkzeug=WARNING"
+def setup_logging(level=None, levels=None, dedup_interval=None):
+    level = level or os.environ.get('MONITOR_LOG_LEVEL', 'INFO')
+    levels = levels if levels is not None else os.environ.get('MONITOR_LOG_LEVELS', '')
+    dedup_interval = dedup_interval if dedup_interval is not None else float(os.environ.get('MONITOR_LOG_DEDUP_SECONDS', '60'))
+
+    output = logging.StreamHandler()
+    output.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    handler = DroppingQueueHandler(queue.Queue(maxsize=10000))
+    handler.addFilter(DedupFilter(interval=dedup_interval))
+    listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    for item in levels.split(','):
+        name, _, value = item.partition('=')
+        if name.strip() and value.strip():
+            logging.getLogger(name.strip()).setLevel(value.strip().upper())
+
+    listener.start()
+    atexit.register(listener.stop) # Kosongkan antrian sebelum proses keluar
+    return handler
+
+
+# Saat diimport oleh aplikasi lain (gunicorn, benchmark) yang sudah mengatur logging, handler root
+# miliknya dibiarkan; entry point app.py sendiri selalu memasang antrian log
+log_handler = setup_logging() if __name__ == '__main__' or not logging.getLogger().handlers else None
+logger = logging.getLogger('monitor')
+sensor_logger = logger.getChild('sensors')
+gpu_logger = logger.getChild('gpu')
+io_logger = logger.getChild('io')
+alert_logger = logger.getChild('alerts')
+sampler_logger = logger.getChild('sampler')
+store_logger = logger.getChild('store')
+fleet_logger = logger.getChild('fleet')
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 
-# Global state for incremental speed calculation
-_prev_disk_io = None
-_prev_disk_time = None
-_prev_net_io = None
-_prev_net_time = None
 
 
 # Konversi byte ke MB
@@ -44,8 +153,8 @@ def format_uptime(seconds):
     else:
         return f"{int(minutes)}m {int(seconds)}s"
 
-# Fungsi untuk mendapatkan suhu dari berbagai sumber
-def get_temperatures():
+# Suhu dari psutil dan tool platform (Windows/macOS); dipakai jika hwmon tidak tersedia
+def _read_temperatures_fallback():
     cpu_temp = 'N/A'
     gpu_temp = 'N/A'
     
@@ -63,66 +172,25 @@ def get_temperatures():
                              cpu_temp = entries[0].current
                     elif any(key in name.lower() for key in ['gpu', 'nvidia', 'amdgpu', 'radeon', 'nouveau']):
                         gpu_temp = entries[0].current
-            if not isinstance(cpu_temp, str): logger.info(f"Got CPU temperature from psutil: {cpu_temp}")
-            if not isinstance(gpu_temp, str): logger.info(f"Got GPU temperature from psutil: {gpu_temp}")
+            if not isinstance(cpu_temp, str): sensor_logger.debug("Got CPU temperature from psutil: %s", cpu_temp)
+            if not isinstance(gpu_temp, str): sensor_logger.debug("Got GPU temperature from psutil: %s", gpu_temp)
     except Exception as e:
-        logger.warning(f"Could not get temperatures from psutil: {str(e)}")
+        sensor_logger.debug("Could not get temperatures from psutil: %s", e)
     
-    if platform.system() == 'Windows':
+    if SYSTEM_NAME == 'Windows':
         if isinstance(cpu_temp, str) and cpu_temp == 'N/A':
             try:
                 result = subprocess.check_output('wmic /namespace:\\\\root\\wmi PATH MSAcpi_ThermalZoneTemperature get CurrentTemperature', shell=True, stderr=subprocess.DEVNULL)
                 temp_str_lines = result.decode('utf-8', errors='ignore').strip().split('\n')
                 if len(temp_str_lines) > 1 and temp_str_lines[1].strip().isdigit():
                     cpu_temp = (int(temp_str_lines[1].strip()) / 10) - 273.15
-                    logger.info(f"Got CPU temperature from wmic: {cpu_temp:.1f}°C")
+                    sensor_logger.debug("Got CPU temperature from wmic: %.1f°C", cpu_temp)
             except (subprocess.CalledProcessError, FileNotFoundError) as e:
-                logger.warning(f"Error getting CPU temperature from wmic: {str(e)}")
+                sensor_logger.warning("Error getting CPU temperature from wmic: %s", e)
         
-        if isinstance(gpu_temp, str) and gpu_temp == 'N/A':
-            try:
-                nvidia_smi_path = "nvidia-smi" 
-                if 'PROGRAMFILES' in os.environ:
-                    path_check = os.path.join(os.environ['PROGRAMFILES'], "NVIDIA Corporation", "NVSMI", "nvidia-smi.exe")
-                    if os.path.exists(path_check):
-                        nvidia_smi_path = f'"{path_check}"' # Quotes for path with spaces
-
-                result = subprocess.check_output(f'{nvidia_smi_path} --query-gpu=temperature.gpu --format=csv,noheader', shell=True, stderr=subprocess.DEVNULL)
-                temp_str = result.decode('utf-8', errors='ignore').strip()
-                if temp_str and temp_str.replace('.', '', 1).isdigit(): # Check if it's a number
-                    gpu_temp = float(temp_str)
-                    logger.info(f"Got GPU temperature from nvidia-smi: {gpu_temp:.1f}°C")
-            except (subprocess.CalledProcessError, FileNotFoundError) as e:
-                logger.warning(f"Error getting GPU temperature from nvidia-smi: {str(e)}")
-    
-    elif platform.system() == 'Linux':
-        if (isinstance(cpu_temp, str) and cpu_temp == 'N/A') or \
-           (isinstance(gpu_temp, str) and gpu_temp == 'N/A'):
-            try:
-                result = subprocess.check_output('sensors', shell=True, stderr=subprocess.DEVNULL)
-                output = result.decode('utf-8', errors='ignore')
-                
-                if isinstance(cpu_temp, str) and cpu_temp == 'N/A':
-                    pkg_match = re.search(r'(?:Package id \d+|Tdie|Composite):\s*\+?(\d+\.\d+)°C', output, re.IGNORECASE)
-                    if pkg_match:
-                        cpu_temp = float(pkg_match.group(1))
-                    else:
-                        cpu_matches = re.findall(r'Core \d+:\s*\+?(\d+\.\d+)°C', output)
-                        if cpu_matches:
-                            cpu_temp = round(sum(float(t) for t in cpu_matches) / len(cpu_matches), 1)
-                    if not isinstance(cpu_temp, str): logger.info(f"Got CPU temperature from sensors: {cpu_temp}°C")
-                
-                if isinstance(gpu_temp, str) and gpu_temp == 'N/A':
-                    gpu_match = re.search(r'(?:amdgpu|nvidia|radeon|nouveau).*\n.*\s+temp1:\s*\+?(\d+\.\d+)°C', output, re.IGNORECASE | re.MULTILINE)
-                    if not gpu_match:
-                         gpu_match = re.search(r'(?:GPU Temperature|temp\d+):\s*\+?(\d+\.\d+)°C', output) # More generic
-                    if gpu_match:
-                        gpu_temp = float(gpu_match.group(1))
-                        logger.info(f"Got GPU temperature from sensors: {gpu_temp}°C")
-            except (subprocess.CalledProcessError, FileNotFoundError) as e:
-                logger.warning(f"Error getting temperatures from sensors: {str(e)}")
+        # Suhu GPU NVIDIA diambil dari stream nvidia-smi (lihat NvidiaSmiStream)
     
-    elif platform.system() == 'Darwin':
+    elif SYSTEM_NAME == 'Darwin':
         if isinstance(cpu_temp, str) and cpu_temp == 'N/A':
             try:
                 # Try common sysctl keys for CPU temperature on macOS
@@ -142,109 +210,676 @@ def get_temperatures():
                 # Actual M1/M2 temp needs pmset -g therm or sudo powermetrics -i 200 -n 1 --samplers smc | grep "CPU die temperature"
                 # This is too complex for a simple check here.
                 # Keeping cpu_temp as 'N/A' if psutil fails on macOS is safer for now.
-                logger.warning("Reliable CPU temperature on macOS often requires specific tools or complex commands.")
+                sensor_logger.warning("Reliable CPU temperature on macOS often requires specific tools or complex commands.")
             except Exception as e:
-                logger.warning(f"Error getting CPU temperature from sysctl (macOS): {str(e)}")
+                sensor_logger.warning("Error getting CPU temperature from sysctl (macOS): %s", e)
     
     return cpu_temp, gpu_temp
 
-# Info GPU menggunakan nvidia-smi
-def get_gpu_info():
-    info = {
+# Backend suhu berbasis /sys/class/hwmon: dipindai sekali, lalu dibaca langsung lewat fd yang tetap terbuka
+class HwmonTemperatureBackend:
+    CPU_CHIPS = ('core', 'cpu', 'k10temp', 'coretemp', 'cpu_thermal', 'soc_thermal', 'package', 'zenpower')
+    GPU_CHIPS = ('gpu', 'nvidia', 'amdgpu', 'radeon', 'nouveau')
+    CPU_PRIORITY_LABELS = ('package', 'die', 'tctl', 'tdie')
+
+    def __init__(self, root='/sys/class/hwmon', ttl=2.0):
+        self.root = root
+        self.ttl = ttl
+        self._cpu_fds = [] # (prioritas, fd); prioritas 0 = package/die
+        self._gpu_fds = []
+        self._cache = None # (waktu monotonic, (cpu_temp, gpu_temp))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _read_text(path):
+        try:
+            with open(path, 'r') as f:
+                return f.read().strip()
+        except OSError:
+            return ''
+
+    # Pindai chip dan sensor yang tersedia. Mengembalikan True jika ada sensor CPU/GPU.
+    def probe(self):
+        self.close()
+        try:
+            hwmon_dirs = sorted(os.listdir(self.root))
+        except OSError:
+            return False
+
+        for hwmon in hwmon_dirs:
+            chip_dir = os.path.join(self.root, hwmon)
+            chip = self._read_text(os.path.join(chip_dir, 'name')).lower()
+            if any(key in chip for key in self.GPU_CHIPS):
+                target = self._gpu_fds
+            elif any(key in chip for key in self.CPU_CHIPS):
+                target = self._cpu_fds
+            else:
+                continue
+            try:
+                inputs = sorted(f for f in os.listdir(chip_dir) if f.startswith('temp') and f.endswith('_input'))
+            except OSError:
+                continue
+            for input_name in inputs:
+                label = self._read_text(os.path.join(chip_dir, input_name.replace('_input', '_label'))).lower()
+                priority = 0 if any(key in label for key in self.CPU_PRIORITY_LABELS) else 1
+                try:
+                    fd = os.open(os.path.join(chip_dir, input_name), os.O_RDONLY)
+                except OSError:
+                    continue
+                target.append((priority, fd))
+
+        # Sensor package/die dibaca lebih dulu; urutan stabil untuk sisanya
+        self._cpu_fds.sort(key=lambda item: item[0])
+        found = bool(self._cpu_fds or self._gpu_fds)
+        if found:
+            sensor_logger.info("hwmon: %d sensor CPU, %d sensor GPU di %s", len(self._cpu_fds), len(self._gpu_fds), self.root)
+        return found
+
+    @staticmethod
+    def _read_fd(fd):
+        # sysfs membuat ulang nilai atribut setiap kali dibaca dari offset 0
+        try:
+            return int(os.pread(fd, 32, 0).strip()) / 1000.0
+        except (OSError, ValueError):
+            return None
+
+    def _first_value(self, fds):
+        for _, fd in fds:
+            value = self._read_fd(fd)
+            if value is not None:
+                return round(value, 1)
+        return 'N/A'
+
+    def read(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._cache is not None and now - self._cache[0] < self.ttl:
+                return self._cache[1]
+            result = (self._first_value(self._cpu_fds), self._first_value(self._gpu_fds))
+            self._cache = (now, result)
+            return result
+
+    def close(self):
+        for _, fd in self._cpu_fds + self._gpu_fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._cpu_fds, self._gpu_fds = [], []
+        self._cache = None
+
+
+SYSTEM_NAME = platform.system() # Dispatch platform cukup sekali
+TEMPERATURE_TTL = float(os.environ.get('MONITOR_TEMP_TTL', '2.0'))
+
+_hwmon_backend = None
+_hwmon_probed = False
+_temp_fallback_cache = None # (waktu monotonic, (cpu_temp, gpu_temp))
+
+
+# Fungsi untuk mendapatkan suhu dari berbagai sumber
+def get_temperatures():
+    global _hwmon_backend, _hwmon_probed, _temp_fallback_cache
+    if not _hwmon_probed:
+        _hwmon_probed = True
+        if SYSTEM_NAME == 'Linux':
+            backend = HwmonTemperatureBackend(ttl=TEMPERATURE_TTL)
+            if backend.probe():
+                _hwmon_backend = backend
+            else:
+                sensor_logger.info("hwmon tidak menyediakan sensor suhu, memakai psutil")
+
+    if _hwmon_backend is not None:
+        return _hwmon_backend.read()
+
+    now = time.monotonic()
+    if _temp_fallback_cache is None or now - _temp_fallback_cache[0] >= TEMPERATURE_TTL:
+        _temp_fallback_cache = (now, _read_temperatures_fallback())
+    return _temp_fallback_cache[1]
+
+# Parse angka dari output nvidia-smi / sysfs; '[N/A]' dan sejenisnya menjadi default
+def _parse_float(value, default=0.0):
+    try:
+        return float(value.strip())
+    except (ValueError, AttributeError):
+        return default
+
+
+def _empty_gpu_info():
+    return {
         'name': 'N/A',
         'usage': 0.0, # Ensure usage is a float
         'mem_total': 0.0,
         'mem_used': 0.0,
-        'mem_free': 0.0
+        'mem_free': 0.0,
+        'temperature': 'N/A',
     }
-    
-    try:
-        nvidia_smi_path = "nvidia-smi"
-        if platform.system() == 'Windows' and 'PROGRAMFILES' in os.environ:
-             path_check = os.path.join(os.environ['PROGRAMFILES'], "NVIDIA Corporation", "NVSMI", "nvidia-smi.exe")
-             if os.path.exists(path_check):
-                 nvidia_smi_path = f'"{path_check}"'
-
-        result_str = subprocess.check_output(
-            f"{nvidia_smi_path} --query-gpu=name,utilization.gpu,memory.total,memory.used,memory.free --format=csv,noheader,nounits",
-            shell=True, stderr=subprocess.DEVNULL
-        ).decode('utf-8', errors='ignore').strip()
-        
-        if result_str:
-            first_gpu_line = result_str.splitlines()[0] # Handle multi-GPU systems, take first
-            result = first_gpu_line.split(',')
-            
-            if len(result) >= 5:
-                info['name'] = result[0].strip()
-                info['usage'] = float(result[1].strip()) if result[1].strip().replace('.', '', 1).isdigit() else 0.0
-                info['mem_total'] = float(result[2].strip()) if result[2].strip().replace('.', '', 1).isdigit() else 0.0
-                info['mem_used'] = float(result[3].strip()) if result[3].strip().replace('.', '', 1).isdigit() else 0.0
-                info['mem_free'] = float(result[4].strip()) if result[4].strip().replace('.', '', 1).isdigit() else 0.0
-                logger.info(f"Got NVIDIA GPU info: {info['name']}, Usage: {info['usage']}%")
-    except (subprocess.CalledProcessError, FileNotFoundError, ValueError) as e: # Added ValueError for float conversion
-        logger.warning(f"Error getting NVIDIA GPU info: {str(e)}")
-        
-        if platform.system() == 'Linux':
+
+
+# Cari nvidia-smi sekali: PATH, lalu lokasi default di Windows
+def find_nvidia_smi():
+    path = shutil.which('nvidia-smi')
+    if path is None and SYSTEM_NAME == 'Windows' and 'PROGRAMFILES' in os.environ:
+        path_check = os.path.join(os.environ['PROGRAMFILES'], "NVIDIA Corporation", "NVSMI", "nvidia-smi.exe")
+        if os.path.exists(path_check):
+            path = path_check
+    return path
+
+
+# Satu proses nvidia-smi --loop-ms yang hidup lama; output dibaca baris per baris di thread reader
+class NvidiaSmiStream:
+    QUERY_FIELDS = ('index', 'name', 'utilization.gpu', 'memory.total', 'memory.used', 'memory.free', 'temperature.gpu')
+
+    def __init__(self, binary, loop_ms=1000, restart_delay=5.0):
+        self.binary = binary
+        self.loop_ms = loop_ms
+        self.restart_delay = restart_delay
+        self._gpus = {} # index -> dict info, diganti per baris
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._proc = None
+        self._thread = None
+
+    def command(self):
+        return [self.binary, f"--query-gpu={','.join(self.QUERY_FIELDS)}",
+                '--format=csv,noheader,nounits', f"--loop-ms={self.loop_ms}"]
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='nvidia-smi-reader', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
             try:
-                card_path_base = "/sys/class/drm/card"
-                gpu_card_device_path = None
-                for i in range(4): # Check card0 to card3
-                    # A simple check: if vendor file exists, it's likely a GPU
-                    if os.path.exists(f"{card_path_base}{i}/device/vendor"):
-                         # Try to determine if it's AMD; more robust checks needed for other vendors
-                        try:
-                            with open(f"{card_path_base}{i}/device/vendor", "r") as f:
-                                vendor_id = f.read().strip()
-                            if vendor_id == "0x1002": # AMD Vendor ID
-                                gpu_card_device_path = f"{card_path_base}{i}/device"
-                                break
-                        except IOError:
-                            continue # Cannot read vendor, try next card
-                
-                if gpu_card_device_path:
-                    with open(f"{gpu_card_device_path}/gpu_busy_percent", "r") as f:
-                        info['usage'] = float(f.read().strip())
-                    
-                    with open(f"{gpu_card_device_path}/mem_info_vram_total", "r") as f:
-                        info['mem_total'] = bytes_to_mb(int(f.read().strip()))
-                    with open(f"{gpu_card_device_path}/mem_info_vram_used", "r") as f:
-                        info['mem_used'] = bytes_to_mb(int(f.read().strip()))
-                    info['mem_free'] = round(info['mem_total'] - info['mem_used'], 1)
-                    info['name'] = "AMD GPU" # Generic name
-                    logger.info(f"Got AMD GPU info (sysfs): Usage: {info['usage']}%")
-            except (IOError, FileNotFoundError, ValueError) as e_amd:
-                logger.warning(f"Error getting AMD GPU info from sysfs: {str(e_amd)}")
-    
+                proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    def parse_line(self, line):
+        fields = [part.strip() for part in line.split(',')]
+        if len(fields) < len(self.QUERY_FIELDS) or not fields[0].isdigit():
+            return None
+        mem_total, mem_used = _parse_float(fields[3]), _parse_float(fields[4])
+        temperature = _parse_float(fields[6], default=None)
+        return int(fields[0]), {
+            'name': fields[1] or 'N/A',
+            'usage': _parse_float(fields[2]),
+            'mem_total': mem_total,
+            'mem_used': mem_used,
+            'mem_free': _parse_float(fields[5], default=round(mem_total - mem_used, 1)),
+            'temperature': temperature if temperature is not None else 'N/A',
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._proc = subprocess.Popen(self.command(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                              text=True, encoding='utf-8', errors='ignore', bufsize=1)
+            except OSError as e:
+                gpu_logger.warning("Tidak bisa menjalankan nvidia-smi: %s", e)
+                self._stop.wait(self.restart_delay)
+                continue
+
+            for line in self._proc.stdout:
+                parsed = self.parse_line(line)
+                if parsed is not None:
+                    index, info = parsed
+                    with self._lock:
+                        self._gpus[index] = info
+                if self._stop.is_set():
+                    break
+
+            self._proc.stdout.close()
+            if self._proc.poll() is None:
+                self._proc.terminate()
+            self._proc.wait()
+            if not self._stop.is_set():
+                gpu_logger.warning("nvidia-smi berhenti (kode %s), restart dalam %ss", self._proc.returncode, self.restart_delay)
+                with self._lock:
+                    self._gpus = {}
+                self._stop.wait(self.restart_delay)
+
+    def latest(self):
+        with self._lock:
+            return [dict(self._gpus[index], index=index) for index in sorted(self._gpus)]
+
+
+# GPU AMD lewat sysfs DRM: kartu di-resolve sekali, file atribut tetap terbuka
+class AmdSysfsGpuSource:
+    AMD_VENDOR_ID = '0x1002'
+
+    def __init__(self, drm_root='/sys/class/drm'):
+        self.drm_root = drm_root
+        self._cards = [] # list dict nama atribut -> fd
+
+    def probe(self):
+        self.close()
+        try:
+            entries = sorted(e for e in os.listdir(self.drm_root) if re.fullmatch(r'card\d+', e))
+        except OSError:
+            return False
+
+        for entry in entries:
+            device_path = os.path.join(self.drm_root, entry, 'device')
+            try:
+                with open(os.path.join(device_path, 'vendor'), 'r') as f:
+                    if f.read().strip() != self.AMD_VENDOR_ID:
+                        continue
+            except OSError:
+                continue
+
+            fds = {}
+            for attr in ('gpu_busy_percent', 'mem_info_vram_total', 'mem_info_vram_used'):
+                try:
+                    fds[attr] = os.open(os.path.join(device_path, attr), os.O_RDONLY)
+                except OSError:
+                    pass
+            hwmon_inputs = glob.glob(os.path.join(device_path, 'hwmon', 'hwmon*', 'temp1_input'))
+            if hwmon_inputs:
+                try:
+                    fds['temp'] = os.open(hwmon_inputs[0], os.O_RDONLY)
+                except OSError:
+                    pass
+            if 'gpu_busy_percent' in fds:
+                fds['card'] = entry
+                self._cards.append(fds)
+            else:
+                for fd in fds.values():
+                    os.close(fd)
+
+        if self._cards:
+            gpu_logger.info("GPU AMD via sysfs: %s", ', '.join(card['card'] for card in self._cards))
+        return bool(self._cards)
+
+    @staticmethod
+    def _read_int(fds, attr):
+        fd = fds.get(attr)
+        if fd is None:
+            return None
+        try:
+            return int(os.pread(fd, 32, 0).strip())
+        except (OSError, ValueError):
+            return None
+
+    def latest(self):
+        gpus = []
+        for index, fds in enumerate(self._cards):
+            info = _empty_gpu_info()
+            info['index'] = index
+            info['name'] = f"AMD GPU ({fds['card']})" # Generic name
+            busy = self._read_int(fds, 'gpu_busy_percent')
+            total = self._read_int(fds, 'mem_info_vram_total')
+            used = self._read_int(fds, 'mem_info_vram_used')
+            temp = self._read_int(fds, 'temp')
+            info['usage'] = float(busy) if busy is not None else 0.0
+            if total is not None:
+                info['mem_total'] = bytes_to_mb(total)
+            if used is not None:
+                info['mem_used'] = bytes_to_mb(used)
+            info['mem_free'] = round(info['mem_total'] - info['mem_used'], 1)
+            if temp is not None:
+                info['temperature'] = round(temp / 1000.0, 1)
+            gpus.append(info)
+        return gpus
+
+    def close(self):
+        for fds in self._cards:
+            for attr, fd in fds.items():
+                if attr != 'card':
+                    try:
+                        os.close(fd)
+                    except OSError:
+                        pass
+        self._cards = []
+
+
+GPU_LOOP_MS = int(os.environ.get('MONITOR_GPU_LOOP_MS', '1000'))
+
+_gpu_source = None
+_gpu_source_resolved = False
+
+
+# Pilih sumber telemetri GPU sekali: nvidia-smi streaming, lalu AMD sysfs (Linux)
+def resolve_gpu_source():
+    global _gpu_source, _gpu_source_resolved
+    if _gpu_source_resolved:
+        return _gpu_source
+    _gpu_source_resolved = True
+
+    nvidia_smi_path = find_nvidia_smi()
+    if nvidia_smi_path:
+        stream = NvidiaSmiStream(nvidia_smi_path, loop_ms=GPU_LOOP_MS)
+        stream.start()
+        atexit.register(stream.stop)
+        _gpu_source = stream
+        gpu_logger.info("Telemetri GPU: %s (loop %s ms)", nvidia_smi_path, GPU_LOOP_MS)
+    elif SYSTEM_NAME == 'Linux':
+        amd = AmdSysfsGpuSource()
+        if amd.probe():
+            _gpu_source = amd
+    if _gpu_source is None:
+        gpu_logger.info("Tidak ada sumber telemetri GPU yang terdeteksi")
+    return _gpu_source
+
+
+# Info semua GPU; field level atas tetap milik GPU pertama (kompatibel dengan dashboard)
+def get_gpu_info():
+    source = resolve_gpu_source()
+    gpus = source.latest() if source is not None else []
+    info = dict(gpus[0]) if gpus else _empty_gpu_info()
+    info.pop('index', None)
+    info['gpus'] = gpus
     return info
 
-# Disk I/O speed (incremental, non-blocking)
-def get_disk_io_speed_incremental():
-    global _prev_disk_io, _prev_disk_time
-    current_time = time.time()
+
+# Mesin laju counter: menghitung laju semua device dalam satu pass dari counter kumulatif
+class CounterRateEngine:
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self._prev = {} # nama device -> tuple nilai counter
+        self._prev_time = None
+        self._lock = threading.Lock()
+
+    # Selisih counter kumulatif. psutil sudah menambal wraparound (nowrap=True), jadi penurunan
+    # nilai berarti counter di-reset (mis. NIC di-reload): lewati sampel ini, baseline baru dipakai berikutnya
+    @staticmethod
+    def _delta(current, previous):
+        if current >= previous:
+            return current - previous
+        return 0
+
+    # counters: dict nama -> namedtuple psutil. Mengembalikan dict nama -> {field: laju per detik}
+    def update(self, counters, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            elapsed = now - self._prev_time if self._prev_time is not None else 0.0
+            rates = {}
+            current = {}
+            for name, counter in counters.items():
+                values = tuple(getattr(counter, field) for field in self.fields)
+                current[name] = values
+                previous = self._prev.get(name)
+                if previous is None or elapsed <= 0:
+                    rates[name] = dict.fromkeys(self.fields, 0.0)
+                    continue
+                rates[name] = {field: self._delta(cur, prev) / elapsed
+                               for field, cur, prev in zip(self.fields, values, previous)}
+            # Device yang hilang otomatis terbuang karena _prev diganti utuh
+            self._prev = current
+            self._prev_time = now
+        return rates
+
+    # Nilai counter mentah dari update terakhir: nama -> {field: nilai kumulatif}
+    def last_counters(self):
+        prev = self._prev
+        return {name: dict(zip(self.fields, values)) for name, values in prev.items()}
+
+
+disk_rate_engine = CounterRateEngine(('read_bytes', 'write_bytes', 'read_count', 'write_count'))
+net_rate_engine = CounterRateEngine(('bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv'))
+
+# Kunci agregat di dalam engine, sama dengan angka total psutil (tanpa partisi ganda)
+TOTAL_KEY = '_total'
+
+
+# Pilih unit tampilan: KB/s untuk laju yang sangat kecil, selain itu MB/s
+def rate_with_unit(bytes_per_sec):
+    mb_per_sec = bytes_per_sec / (1024 * 1024)
+    if mb_per_sec < 0.01 and bytes_per_sec > 0:
+        return round(bytes_per_sec / 1024, 1), "KB/s"
+    return round(mb_per_sec, 2), "MB/s"
+
+
+# Disk I/O per device (throughput dan IOPS)
+def get_disk_io_rates():
     try:
-        current_disk_io = psutil.disk_io_counters()
+        counters = psutil.disk_io_counters(perdisk=True) or {}
+        total = psutil.disk_io_counters()
     except Exception as e:
-        logger.error(f"Failed to get disk_io_counters: {e}")
-        return {'read': 0.0, 'write': 0.0}
+        io_logger.error("Failed to get disk_io_counters: %s", e)
+        return {'read': 0.0, 'write': 0.0, 'read_iops': 0.0, 'write_iops': 0.0, 'devices': {}}
+
+    if total is not None:
+        counters[TOTAL_KEY] = total
+    rates = disk_rate_engine.update(counters)
+
+    def _format(rate):
+        return {
+            'read': bytes_to_mb(rate['read_bytes']), # MB/s
+            'write': bytes_to_mb(rate['write_bytes']),
+            'read_iops': round(rate['read_count'], 1),
+            'write_iops': round(rate['write_count'], 1),
+        }
 
+    result = _format(rates.pop(TOTAL_KEY, dict.fromkeys(disk_rate_engine.fields, 0.0)))
+    result['devices'] = {name: _format(rate) for name, rate in sorted(rates.items())}
+    return result
 
-    read_speed = 0.0
-    write_speed = 0.0
 
-    if _prev_disk_io is not None and _prev_disk_time is not None:
-        time_diff = current_time - _prev_disk_time
-        if time_diff > 0:
-            read_bytes_diff = current_disk_io.read_bytes - _prev_disk_io.read_bytes
-            write_bytes_diff = current_disk_io.write_bytes - _prev_disk_io.write_bytes
-            
-            read_speed = bytes_to_mb(max(0, read_bytes_diff) / time_diff)
-            write_speed = bytes_to_mb(max(0, write_bytes_diff) / time_diff)
-    
-    _prev_disk_io = current_disk_io
-    _prev_disk_time = current_time
-    
-    # logger.info(f"Disk I/O: Read={read_speed:.1f}MB/s, Write={write_speed:.1f}MB/s") # Too frequent logging
-    return {'read': read_speed, 'write': write_speed}
+# Network per interface (throughput dan laju paket) plus total kumulatif
+def get_network_rates():
+    try:
+        counters = psutil.net_io_counters(pernic=True) or {}
+        total = psutil.net_io_counters()
+    except Exception as e:
+        io_logger.error("Failed to get net_io_counters: %s", e)
+        counters, total = {}, None
+
+    if total is not None:
+        counters[TOTAL_KEY] = total
+    rates = net_rate_engine.update(counters)
+    total_rate = rates.pop(TOTAL_KEY, dict.fromkeys(net_rate_engine.fields, 0.0))
+
+    upload_speed, upload_unit = rate_with_unit(total_rate['bytes_sent'])
+    download_speed, download_unit = rate_with_unit(total_rate['bytes_recv'])
+    interfaces = {}
+    for name, rate in sorted(rates.items()):
+        interfaces[name] = {
+            'upload_bps': round(rate['bytes_sent'], 1),
+            'download_bps': round(rate['bytes_recv'], 1),
+            'packets_sent_rate': round(rate['packets_sent'], 1),
+            'packets_recv_rate': round(rate['packets_recv'], 1),
+        }
+
+    return {
+        'sent': bytes_to_mb(total.bytes_sent) if total else 0.0, # Total sent (MB)
+        'recv': bytes_to_mb(total.bytes_recv) if total else 0.0, # Total recv (MB)
+        'packets_sent': total.packets_sent if total else 0,
+        'packets_recv': total.packets_recv if total else 0,
+        'upload_speed': upload_speed, # float, dalam upload_unit
+        'upload_unit': upload_unit, # "MB/s" or "KB/s"
+        'download_speed': download_speed, # float, dalam download_unit
+        'download_unit': download_unit, # "MB/s" atau "KB/s"
+        'upload_bps': round(total_rate['bytes_sent'], 1), # Byte/s mentah
+        'download_bps': round(total_rate['bytes_recv'], 1),
+        'packets_sent_rate': round(total_rate['packets_sent'], 1),
+        'packets_recv_rate': round(total_rate['packets_recv'], 1),
+        'interfaces': interfaces,
+    }
+
+
+# Penggunaan ruang dan inode semua mount. Setiap mount diprobe di thread pool kecil dengan timeout dan
+# circuit breaker sendiri, jadi mount jaringan yang macet tidak pernah menahan sampler.
+class MountMonitor:
+    PSEUDO_FS = {'proc', 'sysfs', 'cgroup', 'cgroup2', 'devpts', 'devtmpfs', 'mqueue', 'debugfs', 'tracefs', 'securityfs',
+                 'pstore', 'bpf', 'configfs', 'fusectl', 'hugetlbfs', 'autofs', 'binfmt_misc', 'rpc_pipefs', 'nsfs',
+                 'efivarfs', 'selinuxfs', 'ramfs', 'squashfs', 'tmpfs', 'nfsd', 'fuse.gvfsd-fuse', 'fuse.portal'}
+    NETWORK_FS = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'ceph', 'glusterfs', 'fuse.sshfs', 'fuse.s3fs', 'afs', '9p')
+
+    def __init__(self, timeout=2.0, local_interval=5.0, network_interval=30.0,
+                 failure_threshold=2, cooldown=60.0, rescan_interval=60.0, exclude_fs=()):
+        self.timeout = timeout
+        self.local_interval = local_interval
+        self.network_interval = network_interval
+        self.failure_threshold = failure_threshold # Kegagalan beruntun sebelum breaker terbuka
+        self.cooldown = cooldown # Lama breaker terbuka, berlipat ganda setiap kali probe ulang gagal
+        self.rescan_interval = rescan_interval
+        self.exclude_fs = self.PSEUDO_FS | set(exclude_fs)
+        self._mounts = {} # mountpoint -> state
+        self._scanned = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def probe(mountpoint):
+        if not hasattr(os, 'statvfs'): # Windows: tanpa statistik inode
+            usage = psutil.disk_usage(mountpoint)
+            return {'total_bytes': usage.total, 'used_bytes': usage.used, 'free_bytes': usage.free}
+        st = os.statvfs(mountpoint)
+        total = st.f_blocks * st.f_frsize
+        free = st.f_bavail * st.f_frsize # Ruang yang tersedia untuk user biasa, sama seperti psutil/df
+        used = (st.f_blocks - st.f_bfree) * st.f_frsize
+        return {
+            'total_bytes': total,
+            'used_bytes': used,
+            'free_bytes': free,
+            'inodes_total': st.f_files,
+            'inodes_used': st.f_files - st.f_ffree,
+            'inodes_free': st.f_favail,
+        }
+
+    def _scan(self, now):
+        try:
+            partitions = psutil.disk_partitions(all=True)
+        except Exception as e:
+            io_logger.error("Gagal membaca daftar mount: %s", e)
+            return
+        seen = set()
+        for part in partitions:
+            if part.fstype in self.exclude_fs or part.mountpoint in seen or part.mountpoint.startswith('/snap/'):
+                continue
+            seen.add(part.mountpoint)
+            state = self._mounts.get(part.mountpoint)
+            if state is None or state['device'] != part.device or state['fstype'] != part.fstype:
+                network = part.fstype.startswith(self.NETWORK_FS)
+                self._mounts[part.mountpoint] = {
+                    'mountpoint': part.mountpoint, 'device': part.device, 'fstype': part.fstype, 'network': network,
+                    'interval': self.network_interval if network else self.local_interval,
+                    'result': None, 'updated': None, 'error': None,
+                    'future': state['future'] if state else None, 'submitted': state['submitted'] if state else None,
+                    'timeouts': state['timeouts'] if state else 0, 'failures': 0, 'open_until': 0.0,
+                }
+        for mountpoint in set(self._mounts) - seen:
+            del self._mounts[mountpoint]
+        self._scanned = now
+
+    def _fail(self, state, now, error):
+        was_open = now < state['open_until']
+        state['failures'] += 1
+        state['error'] = error
+        if state['failures'] >= self.failure_threshold:
+            backoff = self.cooldown * 2 ** min(state['failures'] - self.failure_threshold, 4)
+            state['open_until'] = now + backoff
+            if not was_open:
+                io_logger.warning("Mount %s dilewati selama %.0fs: %s", state['mountpoint'], backoff, error)
+
+    # Setiap probe berjalan di thread daemon sendiri: statvfs yang macet (NFS) hanya menahan thread miliknya,
+    # dan mount yang sama tidak diprobe lagi selama probe sebelumnya belum kembali
+    def _start_probe(self, mountpoint):
+        future = concurrent.futures.Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(self.probe(mountpoint))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name=f"mount-probe {mountpoint}", daemon=True).start()
+        return future
+
+    # Kumpulkan hasil probe yang selesai dan jadwalkan probe yang jatuh tempo; tidak pernah menunggu probe macet
+    def refresh(self, initial_wait=0.2):
+        now = time.monotonic()
+        with self._lock:
+            if self._scanned is None or now - self._scanned >= self.rescan_interval:
+                self._scan(now)
+            submitted = []
+            for mountpoint, state in self._mounts.items():
+                future = state['future']
+                if future is not None:
+                    if future.done():
+                        state['future'] = None
+                        try:
+                            state['result'] = future.result()
+                            state['updated'] = now
+                            state['failures'], state['error'], state['open_until'] = 0, None, 0.0
+                        except Exception as e:
+                            # Bukan hanya OSError: exception lain dari probe (mis. psutil di Windows) tidak boleh
+                            # menggagalkan refresh mount lain maupun collector system.filesystems
+                            self._fail(state, now, str(e) or type(e).__name__)
+                    elif future.running() and now - state['submitted'] >= self.timeout * (state['timeouts'] + 1):
+                        # Thread yang macet tidak bisa dibatalkan; setiap periode timeout dihitung sebagai kegagalan
+                        # sehingga breaker terbuka selama probe belum kembali
+                        state['timeouts'] += 1
+                        self._fail(state, now, 'timeout')
+                    continue
+                due = state['updated'] is None or now - state['updated'] >= state['interval']
+                if due and now >= state['open_until']:
+                    state['future'] = self._start_probe(mountpoint)
+                    state['submitted'] = now
+                    state['timeouts'] = 0
+                    if state['result'] is None:
+                        submitted.append(state['future'])
+        # Sampel pertama: beri probe baru sedikit waktu agar /data tidak kosong
+        if submitted and initial_wait:
+            concurrent.futures.wait(submitted, timeout=initial_wait)
+            if any(future.done() for future in submitted):
+                return self.refresh(initial_wait=0)
+        return self.snapshot(now)
+
+    def snapshot(self, now=None):
+        now = now if now is not None else time.monotonic()
+        mounts = []
+        with self._lock:
+            for mountpoint, state in sorted(self._mounts.items()):
+                result = state['result'] or {}
+                if now < state['open_until']:
+                    status = 'unavailable' # Breaker terbuka
+                elif state['error']:
+                    status = 'stalled' if state['error'] == 'timeout' else 'error'
+                elif state['result'] is None:
+                    status = 'pending'
+                else:
+                    status = 'ok'
+                entry = {
+                    'mountpoint': mountpoint,
+                    'device': state['device'],
+                    'fstype': state['fstype'],
+                    'network': state['network'],
+                    'status': status,
+                    'age': round(now - state['updated'], 1) if state['updated'] is not None else None,
+                }
+                if state['error']:
+                    entry['error'] = state['error']
+                if result:
+                    total, used = result['total_bytes'], result['used_bytes']
+                    entry.update(result)
+                    entry.update({
+                        'total': bytes_to_gb(total),
+                        'used': bytes_to_gb(used),
+                        'free': bytes_to_gb(result['free_bytes']),
+                        # Sama seperti df: terpakai dibanding ruang yang bisa dipakai user
+                        'percent': round(used / (used + result['free_bytes']) * 100, 1) if used + result['free_bytes'] else 0.0,
+                    })
+                    if result.get('inodes_total'):
+                        entry['inodes_percent'] = round(result['inodes_used'] / result['inodes_total'] * 100, 1)
+                mounts.append(entry)
+        return mounts
+
+
+mount_monitor = MountMonitor(
+    timeout=float(os.environ.get('MONITOR_MOUNT_TIMEOUT', '2.0')),
+    local_interval=float(os.environ.get('MONITOR_MOUNT_INTERVAL', '5.0')),
+    network_interval=float(os.environ.get('MONITOR_MOUNT_NETWORK_INTERVAL', '30.0')),
+    exclude_fs=[fs.strip() for fs in os.environ.get('MONITOR_MOUNT_EXCLUDE_FS', '').split(',') if fs.strip()],
+)
 
 
 # Info baterai
@@ -280,14 +915,23 @@ def get_battery_info():
         # logger.info("Battery information not available on this system (psutil attribute/not implemented).")
         return {'percent': 'N/A', 'plugged': False, 'time_left': None}
     except Exception as e:
-        logger.error(f"Error getting battery info: {str(e)}")
+        sensor_logger.error("Error getting battery info: %s", e)
         return {'percent': 'N/A', 'plugged': False, 'time_left': None}
 
 
+BOOT_TIME_REFRESH = 600.0
+_boot_time_cache = None # (waktu monotonic, boot timestamp)
+
+
 # Informasi uptime dan boot time
 def get_system_uptime():
+    global _boot_time_cache
     try:
-        boot_timestamp = psutil.boot_time()
+        # Boot time hanya bergeser karena koreksi jam; cukup dibaca ulang sesekali
+        now = time.monotonic()
+        if _boot_time_cache is None or now - _boot_time_cache[0] >= BOOT_TIME_REFRESH:
+            _boot_time_cache = (now, psutil.boot_time())
+        boot_timestamp = _boot_time_cache[1]
         boot_time = datetime.datetime.fromtimestamp(boot_timestamp)
         boot_time_str = boot_time.strftime('%d-%m-%Y %H:%M:%S') # Format Indonesia
         uptime_seconds = time.time() - boot_timestamp
@@ -301,7 +945,7 @@ def get_system_uptime():
             'uptime_formatted': uptime_formatted
         }
     except Exception as e:
-        logger.error(f"Error getting system uptime: {str(e)}")
+        logger.error("Error getting system uptime: %s", e)
         return {
             'boot_timestamp': 0,
             'boot_time': 'N/A',
@@ -309,30 +953,456 @@ def get_system_uptime():
             'uptime_formatted': 'N/A'
         }
 
-# Menentukan status umum sistem
-def get_system_status(cpu_percent, ram_percent, disk_percent, gpu_usage, cpu_temp):
-    status = "Normal"
-    status_details = [] # Diubah menjadi list string, bukan objek
-    
-    if cpu_percent >= 90: status = "Kritis"; status_details.append("CPU Overload")
-    elif cpu_percent >= 75: status = "Beban Tinggi" if status != "Kritis" else status; status_details.append("CPU Tinggi")
-    
-    if ram_percent >= 90: status = "Kritis"; status_details.append("RAM Hampir Penuh")
-    elif ram_percent >= 80: status = "Beban Tinggi" if status != "Kritis" else status; status_details.append("RAM Tinggi")
-    
-    if disk_percent >= 95: status = "Kritis"; status_details.append("Disk Hampir Penuh")
-    elif disk_percent >= 85: status = "Beban Tinggi" if status != "Kritis" else status; status_details.append("Disk Terbatas")
-    
-    if isinstance(gpu_usage, (int, float)) and gpu_usage >= 90 : status = "Beban Tinggi" if status != "Kritis" else status; status_details.append("GPU Sibuk")
-    
-    if isinstance(cpu_temp, (int, float)): # Hanya jika cpu_temp adalah angka
-        if cpu_temp >= 85: status = "Kritis"; status_details.append("CPU Terlalu Panas")
-        elif cpu_temp >= 75: status = "Beban Tinggi" if status != "Kritis" else status; status_details.append("CPU Panas")
-    
-    return {'status': status, 'details': status_details} # Mengirim 'details' sebagai list
+# Jendela bergulir per metrik dengan state O(1) per sampel:
+# jumlah berjalan (avg), deque monoton (max) dan histogram bin tetap (p95)
+class RollingWindow:
+    def __init__(self, seconds, low=0.0, high=100.0, bins=200):
+        self.seconds = seconds
+        self.low = low
+        self.high = high
+        self.bins = bins
+        self._items = deque() # (timestamp, value, bin)
+        self._sum = 0.0
+        self._max = deque() # (timestamp, value), nilai menurun
+        self._hist = [0] * bins
+        self._last = None
+
+    def _bin(self, value):
+        position = int((value - self.low) / (self.high - self.low) * self.bins)
+        return min(self.bins - 1, max(0, position))
+
+    def add(self, timestamp, value):
+        bin_index = self._bin(value)
+        self._items.append((timestamp, value, bin_index))
+        self._sum += value
+        self._hist[bin_index] += 1
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((timestamp, value))
+        self._last = value
+        self.expire(timestamp)
+
+    # Buang entri yang lebih tua dari jendela; dipanggil juga saat metrik tidak terbaca (N/A)
+    def expire(self, now):
+        cutoff = now - self.seconds
+        while self._items and self._items[0][0] < cutoff:
+            _, old_value, old_bin = self._items.popleft()
+            self._sum -= old_value
+            self._hist[old_bin] -= 1
+        while self._max and self._max[0][0] < cutoff:
+            self._max.popleft()
+        if not self._items:
+            self._last = None
+
+    def aggregate(self, kind):
+        if not self._items:
+            return None
+        if kind == 'last':
+            return self._last
+        if kind == 'avg':
+            return self._sum / len(self._items)
+        if kind == 'max':
+            return self._max[0][1]
+        if kind.startswith('p'):
+            # Persentil dari histogram: jumlah bin konstan, tidak bergantung panjang jendela
+            rank = int(kind[1:]) / 100.0 * len(self._items)
+            seen = 0
+            width = (self.high - self.low) / self.bins
+            for index, count in enumerate(self._hist):
+                seen += count
+                if seen >= rank:
+                    return self.low + (index + 1) * width
+            return self.high
+        raise ValueError(f"Agregat tidak dikenal: {kind}")
+
+
+# Aturan default setara ambang lama get_system_status, ditambah durasi dan hysteresis.
+# 'group' memastikan hanya tingkat paling parah per komponen yang tampil di status.
+DEFAULT_ALERT_RULES = [
+    {'name': 'cpu_critical', 'group': 'cpu', 'metric': 'cpu.percent', 'aggregate': 'avg', 'window': 60, 'threshold': 90, 'clear': 80, 'for': 30, 'severity': 'Kritis', 'detail': 'CPU Overload'},
+    {'name': 'cpu_high', 'group': 'cpu', 'metric': 'cpu.percent', 'aggregate': 'avg', 'window': 60, 'threshold': 75, 'clear': 70, 'for': 30, 'severity': 'Beban Tinggi', 'detail': 'CPU Tinggi'},
+    {'name': 'ram_critical', 'group': 'ram', 'metric': 'ram.percent', 'aggregate': 'last', 'window': 0, 'threshold': 90, 'clear': 85, 'for': 15, 'severity': 'Kritis', 'detail': 'RAM Hampir Penuh'},
+    {'name': 'ram_high', 'group': 'ram', 'metric': 'ram.percent', 'aggregate': 'last', 'window': 0, 'threshold': 80, 'clear': 75, 'for': 15, 'severity': 'Beban Tinggi', 'detail': 'RAM Tinggi'},
+    {'name': 'disk_critical', 'group': 'disk', 'metric': 'disk.percent', 'aggregate': 'last', 'window': 0, 'threshold': 95, 'clear': 93, 'for': 0, 'severity': 'Kritis', 'detail': 'Disk Hampir Penuh'},
+    {'name': 'disk_high', 'group': 'disk', 'metric': 'disk.percent', 'aggregate': 'last', 'window': 0, 'threshold': 85, 'clear': 83, 'for': 0, 'severity': 'Beban Tinggi', 'detail': 'Disk Terbatas'},
+    {'name': 'gpu_busy', 'group': 'gpu', 'metric': 'gpu.usage', 'aggregate': 'avg', 'window': 60, 'threshold': 90, 'clear': 80, 'for': 30, 'severity': 'Beban Tinggi', 'detail': 'GPU Sibuk'},
+    {'name': 'cpu_temp_critical', 'group': 'cpu_temp', 'metric': 'cpu.temperature', 'aggregate': 'p95', 'window': 60, 'threshold': 85, 'clear': 80, 'for': 10, 'severity': 'Kritis', 'detail': 'CPU Terlalu Panas', 'range': [0, 130]},
+    {'name': 'cpu_temp_high', 'group': 'cpu_temp', 'metric': 'cpu.temperature', 'aggregate': 'p95', 'window': 60, 'threshold': 75, 'clear': 70, 'for': 10, 'severity': 'Beban Tinggi', 'detail': 'CPU Panas', 'range': [0, 130]},
+]
+
+SEVERITY_RANK = {'Beban Tinggi': 1, 'Kritis': 2}
+
+
+# Rules engine alert: dievaluasi inkremental setiap sampel di thread sampler, bukan per request HTTP.
+# State per aturan: inactive -> pending (menunggu 'for' detik) -> firing -> inactive saat nilai melewati 'clear'.
+class AlertEngine:
+    def __init__(self, rules, max_transitions=500):
+        self.rules = [dict(rule) for rule in rules]
+        self._windows = {} # (metric, window, range) -> RollingWindow, dipakai bersama antar aturan
+        self._state = {rule['name']: {'state': 'inactive', 'since': None, 'value': None} for rule in self.rules}
+        self._transitions = deque(maxlen=max_transitions)
+        self._seq = 0
+        self._lock = threading.Lock()
+        for rule in self.rules:
+            low, high = rule.get('range', (0, 100))
+            key = (rule['metric'], rule.get('window', 0), low, high)
+            if key not in self._windows:
+                self._windows[key] = RollingWindow(max(rule.get('window', 0), 0), low=low, high=high)
+            rule['_window_key'] = key
+
+    REQUIRED_KEYS = ('name', 'metric', 'threshold', 'severity', 'detail')
+
+    # Alasan aturan tidak valid, atau None jika aturan bisa dipakai
+    @classmethod
+    def _validate(cls, rule):
+        missing = [key for key in cls.REQUIRED_KEYS if key not in rule]
+        if missing:
+            return f"kunci wajib tidak ada: {', '.join(missing)}"
+        if not isinstance(rule['metric'], str) or not rule['metric']:
+            return "metric harus berupa string"
+        if rule['severity'] not in SEVERITY_RANK:
+            return f"severity tidak dikenal: {rule['severity']!r}"
+        for key in ('threshold', 'clear', 'for', 'window'):
+            if key in rule and (not isinstance(rule[key], (int, float)) or isinstance(rule[key], bool)):
+                return f"{key} harus berupa angka"
+        aggregate = rule.get('aggregate', 'last')
+        if not isinstance(aggregate, str) or not (aggregate in ('last', 'avg', 'max') or re.fullmatch(r'p\d{1,2}', aggregate)):
+            return f"aggregate tidak dikenal: {aggregate}"
+        low_high = rule.get('range', (0, 100))
+        if (not isinstance(low_high, (list, tuple)) or len(low_high) != 2
+                or not all(isinstance(v, (int, float)) for v in low_high) or low_high[0] >= low_high[1]):
+            return "range harus [min, max] dengan min < max"
+        return None
+
+    # Muat aturan dari file JSON (list aturan); aturan dengan nama sama menimpa default.
+    # Aturan yang tidak valid dicatat dan dilewati (default dengan nama sama tetap dipakai).
+    @classmethod
+    def from_config(cls, path=None):
+        rules = {rule['name']: rule for rule in DEFAULT_ALERT_RULES}
+        if path:
+            try:
+                with open(path, 'r') as f:
+                    loaded = json.load(f)
+                if not isinstance(loaded, list):
+                    raise TypeError('isi file harus berupa list aturan')
+                for rule in loaded:
+                    if not isinstance(rule, dict) or not isinstance(rule.get('name'), str):
+                        alert_logger.error("Aturan alert tanpa nama dilewati: %r", rule)
+                        continue
+                    merged = dict(rules.get(rule['name'], {}), **rule)
+                    problem = cls._validate(merged)
+                    if problem:
+                        alert_logger.error("Aturan alert %s dilewati: %s", rule['name'], problem)
+                        continue
+                    rules[rule['name']] = merged
+                alert_logger.info("Aturan alert dimuat dari %s", path)
+            except (OSError, ValueError, TypeError) as e:
+                alert_logger.error("Gagal memuat aturan alert dari %s: %s", path, e)
+        return cls([rule for rule in rules.values() if rule.get('enabled', True)])
+
+    @staticmethod
+    def _lookup(results, path):
+        value = results
+        for part in path.split('.'):
+            if not isinstance(value, dict) or part not in value:
+                return None
+            value = value[part]
+        return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+    def evaluate(self, results, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            for (metric, *_), window in self._windows.items():
+                value = self._lookup(results, metric)
+                if value is not None:
+                    window.add(now, value)
+                else:
+                    window.expire(now)
+
+            for rule in self.rules:
+                state = self._state[rule['name']]
+                value = self._windows[rule['_window_key']].aggregate(rule.get('aggregate', 'last'))
+                state['value'] = round(value, 2) if value is not None else None
+                current = state['state']
+                if value is None:
+                    # Metrik hilang (sensor/GPU tidak terbaca) dan jendela sudah kosong: alert dianggap selesai
+                    if current != 'inactive':
+                        self._transition(rule, state, 'inactive', now)
+                    continue
+                if current == 'firing':
+                    # Hysteresis: alert baru selesai setelah nilai turun di bawah ambang 'clear'
+                    if value < rule.get('clear', rule['threshold']):
+                        self._transition(rule, state, 'inactive', now)
+                elif value >= rule['threshold']:
+                    if current == 'inactive':
+                        self._transition(rule, state, 'pending', now)
+                    if now - state['since'] >= rule.get('for', 0):
+                        self._transition(rule, state, 'firing', now)
+                elif current == 'pending':
+                    self._transition(rule, state, 'inactive', now)
+
+    def _transition(self, rule, state, new_state, now):
+        old_state = state['state']
+        if old_state == new_state:
+            return
+        state['state'] = new_state
+        state['since'] = now
+        self._seq += 1
+        self._transitions.append({
+            'seq': self._seq,
+            'timestamp': round(now, 3),
+            'rule': rule['name'],
+            'from': old_state,
+            'to': new_state,
+            'value': state['value'],
+            'severity': rule['severity'],
+            'detail': rule['detail'],
+        })
+        if new_state == 'firing':
+            alert_logger.warning("Alert %s aktif: %s %s=%s", rule['name'], rule['metric'], rule.get('aggregate', 'last'), state['value'])
+        elif old_state == 'firing':
+            alert_logger.info("Alert %s selesai: %s=%s", rule['name'], rule['metric'], state['value'])
+
+    def active(self, states=('firing',)):
+        with self._lock:
+            return [{
+                'rule': rule['name'],
+                'state': self._state[rule['name']]['state'],
+                'since': round(self._state[rule['name']]['since'], 3),
+                'value': self._state[rule['name']]['value'],
+                'metric': rule['metric'],
+                'aggregate': rule.get('aggregate', 'last'),
+                'threshold': rule['threshold'],
+                'severity': rule['severity'],
+                'detail': rule['detail'],
+                'group': rule.get('group', rule['name']),
+            } for rule in self.rules if self._state[rule['name']]['state'] in states]
+
+    def transitions(self, since=0):
+        with self._lock:
+            return [item for item in self._transitions if item['seq'] > since]
+
+    # Status sistem dari alert yang sedang firing (pengganti if-chain get_system_status)
+    def system_status(self):
+        worst = {}
+        for alert in self.active():
+            current = worst.get(alert['group'])
+            if current is None or SEVERITY_RANK.get(alert['severity'], 0) > SEVERITY_RANK.get(current['severity'], 0):
+                worst[alert['group']] = alert
+        status = "Normal"
+        if worst:
+            top = max(worst.values(), key=lambda alert: SEVERITY_RANK.get(alert['severity'], 0))
+            status = top['severity']
+        return {'status': status, 'details': [alert['detail'] for alert in worst.values()]}
+
+
+alert_engine = AlertEngine.from_config(os.environ.get('MONITOR_ALERT_RULES'))
+
+# Statistik streaming satu metrik, O(1) per sampel: EWMA mean/varian berbasis waktu (sampel tidak teratur
+# tetap berbobot benar) dan tren linear dari regresi berbobot eksponensial atas waktu.
+class EwmaStats:
+    def __init__(self, halflife=300.0, trend_halflife=3600.0, min_std=0.0):
+        self.tau = halflife / math.log(2)
+        self.trend_tau = trend_halflife / math.log(2)
+        # Batas bawah std untuk z-score: varian EWMA deret datar/terkuantisasi meluruh ke ~0, sehingga
+        # perubahan sekecil resolusi metrik (0.1 poin disk, 1% GPU) menghasilkan z ratusan
+        self.min_std = min_std
+        self.count = 0
+        self.value = None
+        self.last_time = None
+        self.origin = None # Waktu dikurangi origin agar presisi float regresi terjaga
+        self.mean = self.var = self.z = 0.0
+        self.t_mean = self.x_mean = self.cov = self.t_var = 0.0
+
+    def update(self, t, x):
+        if self.count == 0:
+            self.origin, self.mean, self.x_mean = t, x, x
+        else:
+            dt = max(t - self.last_time, 0.0)
+            std = max(math.sqrt(self.var), self.min_std)
+            self.z = (x - self.mean) / std if std > 1e-9 else 0.0 # Dibanding baseline sebelum sampel ini
+            a = 1.0 - math.exp(-dt / self.tau)
+            delta = x - self.mean
+            self.mean += a * delta
+            self.var = (1.0 - a) * (self.var + a * delta * delta)
+            b = 1.0 - math.exp(-dt / self.trend_tau)
+            dx, dtt = x - self.x_mean, (t - self.origin) - self.t_mean
+            self.x_mean += b * dx
+            self.t_mean += b * dtt
+            self.cov = (1.0 - b) * (self.cov + b * dx * dtt)
+            self.t_var = (1.0 - b) * (self.t_var + b * dtt * dtt)
+        self.count += 1
+        self.value = x
+        self.last_time = t
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+    # Kemiringan per detik; None selama rentang data terlalu pendek untuk tren yang berarti
+    def slope(self, min_span=600.0):
+        if self.count < 2 or self.last_time - self.origin < min_span or self.t_var <= 1e-9:
+            return None
+        return self.cov / self.t_var
+
+    # Hitung ulang state dari deret riwayat sekaligus (vectorized); hasilnya sama dengan update() berulang
+    @classmethod
+    def from_history(cls, timestamps, values, halflife=300.0, trend_halflife=3600.0, min_std=0.0):
+        stats = cls(halflife, trend_halflife, min_std)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        mask = np.isfinite(values) & np.isfinite(timestamps)
+        t, x = timestamps[mask], values[mask]
+        if len(t) == 0:
+            return stats
+
+        def weights(tau):
+            # Bobot sampel i di akhir deret: a_i * prod_{j>i}(1 - a_j) = a_i * exp(-(T - t_i) / tau); a_0 = 1
+            a = 1.0 - np.exp(-np.diff(t, prepend=t[0]) / tau)
+            a[0] = 1.0
+            return a * np.exp(-(t[-1] - t) / tau)
+
+        w = weights(stats.tau)
+        stats.mean = float(w @ x)
+        stats.var = float(w @ (x - stats.mean) ** 2)
+        wt = weights(stats.trend_tau)
+        rt = t - t[0]
+        stats.t_mean, stats.x_mean = float(wt @ rt), float(wt @ x)
+        stats.cov = float(wt @ ((rt - stats.t_mean) * (x - stats.x_mean)))
+        stats.t_var = float(wt @ (rt - stats.t_mean) ** 2)
+        stats.count, stats.value, stats.origin, stats.last_time = len(t), float(x[-1]), float(t[0]), float(t[-1])
+        return stats
+
+
+# Baseline, anomali, tren, dan perkiraan disk penuh untuk setiap sampel
+class StreamingStats:
+    # Std minimum per metrik dalam satuan metrik itu; deviasi di bawah nilai ini tidak pernah dianggap anomali
+    MIN_STD = {
+        'cpu': 1.0, 'ram': 1.0, 'disk': 1.0, 'gpu': 1.0, # Poin persen
+        'net_upload': 10000.0, 'net_download': 10000.0, # Byte/s
+        'disk_read': 0.5, 'disk_write': 0.5, # MB/s
+    }
+
+    def __init__(self, metrics, halflife=300.0, trend_halflife=3600.0, disk_trend_halflife=6 * 3600.0,
+                 z_threshold=3.0, warmup=30, eta_horizon=30 * 86400.0, min_std=None):
+        self.metrics = tuple(metrics)
+        self.min_std = dict(self.MIN_STD, **(min_std or {}))
+        self.halflife = halflife
+        self.trend_halflife = trend_halflife
+        self.disk_trend_halflife = disk_trend_halflife # Pengisian disk dilihat dalam skala jam-hari
+        self.z_threshold = z_threshold
+        self.warmup = warmup # Sampel minimum sebelum z-score dianggap bermakna
+        self.eta_horizon = eta_horizon # ETA lebih jauh dari ini tidak dilaporkan
+        self._stats = {}
+        self._seeded = False
+        self._lock = threading.Lock()
+
+    # Baseline awal dari store di disk supaya restart tidak mengulang masa warmup. Hanya tier raw: rata-rata
+    # rollup 1m meredam varian sehingga std terlalu kecil dan hampir semua sampel awal dianggap anomali
+    def seed(self, source, window=6 * 3600.0):
+        now = time.time()
+        for metric in self.metrics:
+            try:
+                result = source.query(metric, now - window, now, tier='raw')
+            except sqlite3.Error as e:
+                store_logger.warning("Gagal membaca riwayat untuk baseline %s: %s", metric, e)
+                continue
+            if len(result['values']):
+                self._stats[metric] = EwmaStats.from_history(result['timestamps'], result['values'],
+                                                             self.halflife, self.trend_halflife,
+                                                             self.min_std.get(metric, 0.0))
+
+    # Hasil yang sudah lewat jadwal probe-nya (filesystems tidak diminta lagi) dilewati: nilai lama
+    # dengan timestamp baru menarik laju pengisian ke nol
+    @staticmethod
+    def _fresh_mounts(monitor):
+        mounts = []
+        for mount in monitor.snapshot():
+            interval = monitor.network_interval if mount['network'] else monitor.local_interval
+            if mount['status'] == 'ok' and 'used_bytes' in mount and mount['age'] is not None \
+                    and mount['age'] <= 2 * interval + 1.0:
+                mounts.append(mount)
+        return mounts
+
+    def _track(self, key, t, x, trend_halflife):
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = EwmaStats(self.halflife, trend_halflife, self.min_std.get(key, 0.0))
+        stats.update(t, x)
+        return stats
+
+    def update(self, timestamp, data):
+        with self._lock:
+            if not self._seeded:
+                self._seeded = True
+                if store is not None:
+                    self.seed(store)
+            metrics = {}
+            anomalies = []
+            for metric, value in history_values(data).items():
+                if not isinstance(value, (int, float)) or value != value:
+                    continue
+                stats = self._track(metric, timestamp, float(value), self.trend_halflife)
+                anomaly = stats.count > self.warmup and abs(stats.z) >= self.z_threshold
+                slope = stats.slope()
+                metrics[metric] = {
+                    'value': round(stats.value, 2),
+                    'mean': round(stats.mean, 2),
+                    'std': round(stats.std, 2),
+                    'z': round(stats.z, 2),
+                    'anomaly': anomaly,
+                    'trend_per_hour': round(slope * 3600, 3) if slope is not None else None,
+                }
+                if anomaly:
+                    anomalies.append(metric)
+
+            # Mount dari MountMonitor (jika pernah diminta), selain itu root dari collector disk
+            mounts = self._fresh_mounts(mount_monitor)
+            if not mounts and 'used_bytes' in data.get('disk', {}):
+                mounts = [dict(data['disk'], mountpoint='/')]
+            disk_eta = []
+            for mount in mounts:
+                stats = self._track(f"fs:{mount['mountpoint']}", timestamp, float(mount['used_bytes']), self.disk_trend_halflife)
+                slope = stats.slope()
+                if slope is None or slope <= 0 or stats.count <= self.warmup:
+                    continue
+                eta = mount['free_bytes'] / slope
+                if eta <= self.eta_horizon:
+                    disk_eta.append({
+                        'mountpoint': mount['mountpoint'],
+                        'free_bytes': mount['free_bytes'],
+                        'fill_rate_bytes_per_hour': round(slope * 3600),
+                        'eta_seconds': round(eta),
+                        'eta': format_uptime(eta),
+                    })
+            disk_eta.sort(key=lambda item: item['eta_seconds'])
+            return {'metrics': metrics, 'anomalies': anomalies, 'disk_eta': disk_eta}
+
+
+# Ringkasan statistik satu jendela riwayat, dihitung sekaligus dengan NumPy (untuk /history?stats=1)
+def history_stats(timestamps, values, halflife=300.0, trend_halflife=3600.0):
+    finite = values[np.isfinite(values)] if len(values) else values
+    if not len(finite):
+        return None
+    ewma = EwmaStats.from_history(timestamps, values, halflife, trend_halflife)
+    slope = ewma.slope(min_span=0.0)
+    return {
+        'mean': round(float(finite.mean()), 3),
+        'std': round(float(finite.std()), 3),
+        'min': round(float(finite.min()), 3),
+        'max': round(float(finite.max()), 3),
+        'ewma_mean': round(ewma.mean, 3),
+        'ewma_std': round(ewma.std, 3),
+        'trend_per_hour': round(slope * 3600, 3) if slope is not None else None,
+    }
+
+
+METRIC_LABELS = {'cpu': 'CPU', 'ram': 'RAM', 'disk': 'Disk', 'gpu': 'GPU', 'net_upload': 'Upload jaringan',
+                 'net_download': 'Download jaringan', 'disk_read': 'Baca disk', 'disk_write': 'Tulis disk'}
+
 
 # Menentukan rekomendasi untuk optimasi sistem
-def get_system_recommendations(cpu_percent, ram_percent, disk_percent, gpu_usage, top_processes):
+def get_system_recommendations(cpu_percent, ram_percent, disk_percent, gpu_usage, top_processes, stats=None):
     recommendations = []
     
     if cpu_percent >= 80:
@@ -347,7 +1417,22 @@ def get_system_recommendations(cpu_percent, ram_percent, disk_percent, gpu_usage
     elif disk_percent >= 80: recommendations.append("Ruang disk menipis, lakukan pembersihan.")
     
     if isinstance(gpu_usage, (int, float)) and gpu_usage >= 90: recommendations.append("GPU bekerja keras, tutup aplikasi grafis berat.")
-    
+
+    # Rekomendasi dari statistik streaming: perkiraan disk penuh, tren naik, dan anomali terhadap baseline
+    if stats:
+        for item in stats.get('disk_eta', []):
+            if item['eta_seconds'] <= 7 * 86400:
+                recommendations.append(f"Disk {item['mountpoint']} diperkirakan penuh dalam {item['eta']} "
+                                       f"(bertambah {bytes_to_gb(item['fill_rate_bytes_per_hour'] * 24)} GB/hari).")
+        ram_trend = stats.get('metrics', {}).get('ram', {}).get('trend_per_hour')
+        if ram_trend is not None and ram_trend >= 1.0:
+            recommendations.append(f"RAM terus naik {ram_trend:.1f}%/jam, periksa kemungkinan memory leak.")
+        for metric in stats.get('anomalies', []):
+            info = stats['metrics'][metric]
+            direction = 'Lonjakan' if info['z'] > 0 else 'Penurunan'
+            recommendations.append(f"{direction} {METRIC_LABELS.get(metric, metric)} tidak biasa: {info['value']} "
+                                   f"(rata-rata {info['mean']}, z={info['z']}).")
+
     if not recommendations: recommendations.append("Sistem berjalan optimal.") # Diubah
     
     return recommendations[:3]
@@ -357,164 +1442,2272 @@ def index():
     # logger.info("Halaman index diakses")
     return render_template('index.html')
 
-@app.route('/data')
-def get_data():
-    global _prev_net_io, _prev_net_time
-    try:
-        # logger.info("API data diakses")
-        current_call_time = time.time()
-        
-        cpu_percent = psutil.cpu_percent(interval=0.1) # Blocking, tapi pendek
-
-        ram = psutil.virtual_memory()
-        ram_percent = ram.percent
-        ram_total, ram_used, ram_free = bytes_to_gb(ram.total), bytes_to_gb(ram.used), bytes_to_gb(ram.available)
-
-        disk_usage_obj = psutil.disk_usage('/') # Menggunakan objek disk_usage agar lebih jelas
-        disk_percent = disk_usage_obj.percent
-        disk_total = bytes_to_gb(disk_usage_obj.total)
-        disk_used = bytes_to_gb(disk_usage_obj.used)
-        disk_free = bytes_to_gb(disk_usage_obj.free)
-
-        disk_io = get_disk_io_speed_incremental() # Non-blocking
-
-        cpu_temp, gpu_temp = get_temperatures()
-        gpu_info = get_gpu_info() # Pastikan usage selalu float
-        battery_info = get_battery_info() # Pastikan percent selalu angka atau 'N/A'
-        system_uptime = get_system_uptime()
-
-        # Network totals & speed (non-blocking incremental)
-        current_network_sample_time = time.time() # Timestamp SEBELUM mengambil data network
-        current_net_io = psutil.net_io_counters()
-        net_sent_total = bytes_to_mb(current_net_io.bytes_sent)
-        net_recv_total = bytes_to_mb(current_net_io.bytes_recv)
-        net_packets_sent = current_net_io.packets_sent
-        net_packets_recv = current_net_io.packets_recv
-        
-        net_upload_speed, net_download_speed = 0.0, 0.0
+# Tracker proses inkremental: objek psutil.Process dipertahankan antar sampel sehingga
+# cpu_percent dihitung terhadap sampel sebelumnya (bukan 0.0 untuk objek baru setiap kali)
+class ProcessTracker:
+    SORT_KEYS = {'cpu': 'cpu_percent', 'mem': 'memory_percent', 'io': 'io_rate'}
 
-        upload_unit = "MB/s"
-        download_unit = "MB/s"
+    def __init__(self, io_ttl=60.0):
+        self.io_ttl = io_ttl # Counter I/O per proses hanya dibaca jika diminta baru-baru ini
+        self._procs = {} # pid -> psutil.Process
+        self._prev_io = {} # pid -> total byte I/O sampel sebelumnya
+        self._prev_time = None
+        self._io_requested = None
+        self._table = [] # Hasil refresh terakhir, diganti utuh
+        self._lock = threading.Lock()
 
-        logger.info(f"[NET_DEBUG] Panggilan ke /data. current_sample_time: {current_network_sample_time:.4f}")
-        if _prev_net_io is not None and _prev_net_time is not None:
-            logger.info(f"[NET_DEBUG] _prev_net_time: {_prev_net_time:.4f}, _prev_sent: {_prev_net_io.bytes_sent}, _prev_recv: {_prev_net_io.bytes_recv}")
-        
-            time_diff_net = current_network_sample_time - _prev_net_time 
-            logger.info(f"[NET_DEBUG] time_diff_net: {time_diff_net:.4f}s")
-        
-            if time_diff_net > 0.01: 
-                bytes_sent_diff = current_net_io.bytes_sent - _prev_net_io.bytes_sent
-                bytes_recv_diff = current_net_io.bytes_recv - _prev_net_io.bytes_recv
-                logger.info(f"[NET_DEBUG] current_sent: {current_net_io.bytes_sent}, current_recv: {current_net_io.bytes_recv}")
-                logger.info(f"[NET_DEBUG] bytes_sent_diff: {bytes_sent_diff}, bytes_recv_diff: {bytes_recv_diff}")
-                
-                upload_bps = max(0, bytes_sent_diff) / time_diff_net
-                download_bps = max(0, bytes_recv_diff) / time_diff_net
-                logger.info(f"[NET_DEBUG] upload_Bps: {upload_bps:.2f}, download_Bps: {download_bps:.2f}")
-
-                # Hitung kecepatan dalam MB/s dulu
-                current_upload_mb_speed = upload_bps / (1024 * 1024)
-                current_download_mb_speed = download_bps / (1024 * 1024)
-
-                # Tentukan nilai dan unit untuk upload
-                if current_upload_mb_speed < 0.01 and upload_bps > 0: # Jika MB/s sangat kecil (<0.01) tapi Bps ada
-                    net_upload_speed_value = round(upload_bps / 1024, 1) # Konversi ke KB/s
-                    upload_unit = "KB/s"
-                else:
-                    net_upload_speed_value = round(current_upload_mb_speed, 2) # Tetap MB/s, presisi
+    def request_io(self):
+        self._io_requested = time.monotonic()
+
+    def _io_enabled(self, now):
+        return self._io_requested is not None and now - self._io_requested < self.io_ttl
+
+    def refresh(self):
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._prev_time if self._prev_time is not None else 0.0
+            track_io = self._io_enabled(now)
+            pids = set(psutil.pids())
+
+            # Hanya PID yang keluar/baru yang diubah; proses lama tetap memakai objek yang sama
+            for pid in self._procs.keys() - pids:
+                self._forget(pid)
+            new_pids = pids - self._procs.keys()
+            for pid in new_pids:
+                try:
+                    proc = psutil.Process(pid)
+                    proc.cpu_percent(None) # Baseline; nilai valid mulai sampel berikutnya
+                    self._procs[pid] = proc
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    pass
+
+            table = []
+            io_now = {}
+            for pid, proc in list(self._procs.items()):
+                # PID yang dipakai ulang proses lain (create_time berbeda) tidak boleh mewarisi baseline CPU/I/O lama
+                if pid not in new_pids and not proc.is_running():
+                    self._forget(pid)
+                    try:
+                        proc = psutil.Process(pid)
+                        proc.cpu_percent(None)
+                        self._procs[pid] = proc
+                        new_pids.add(pid)
+                    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                        continue
+                try:
+                    with proc.oneshot():
+                        # Nama dibaca ulang setiap refresh karena bisa berubah setelah exec
+                        name = proc.name()
+                        # PID baru baru saja di-baseline; membacanya lagi sekarang hanya menghasilkan noise
+                        cpu_percent = proc.cpu_percent(None) if pid not in new_pids else 0.0
+                        memory_percent = proc.memory_percent()
+                    io_rate = 0.0
+                    if track_io:
+                        try:
+                            counters = proc.io_counters()
+                            io_total = counters.read_bytes + counters.write_bytes
+                            io_now[pid] = io_total
+                            previous = self._prev_io.get(pid)
+                            if previous is not None and elapsed > 0:
+                                io_rate = max(0, io_total - previous) / elapsed
+                        except (psutil.AccessDenied, AttributeError, NotImplementedError):
+                            pass
+                except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                    self._forget(pid)
+                    continue
+                except psutil.AccessDenied:
+                    continue
+                table.append({
+                    'pid': pid,
+                    'name': name or 'N/A',
+                    'cpu_percent': cpu_percent if cpu_percent is not None else 0.0,
+                    'memory_percent': round(memory_percent or 0.0, 2),
+                    'io_rate': round(io_rate, 1), # Byte/s baca+tulis
+                })
+
+            self._prev_io = io_now
+            self._prev_time = now
+            self._table = table
+        return table
+
+    def _forget(self, pid):
+        self._procs.pop(pid, None)
+        self._prev_io.pop(pid, None)
+
+    def __len__(self):
+        return len(self._table)
 
-                # Tentukan nilai dan unit untuk download
-                if current_download_mb_speed < 0.01 and download_bps > 0:
-                    net_download_speed_value = round(download_bps / 1024, 1)
-                    download_unit = "KB/s"
+    # Top-K dengan heap (O(n log k)), tanpa mengurutkan seluruh tabel
+    def top(self, limit=10, sort='cpu', group_by=None):
+        key = self.SORT_KEYS[sort]
+        rows = self._table
+        if group_by == 'name':
+            groups = {}
+            for row in rows:
+                group = groups.get(row['name'])
+                if group is None:
+                    groups[row['name']] = {'name': row['name'], 'count': 1, 'pids': [row['pid']],
+                                           'cpu_percent': row['cpu_percent'], 'memory_percent': row['memory_percent'],
+                                           'io_rate': row['io_rate']}
                 else:
-                    net_download_speed_value = round(current_download_mb_speed, 2)
-                    # download_unit sudah "MB/s" (default)
+                    group['count'] += 1
+                    group['pids'].append(row['pid'])
+                    group['cpu_percent'] += row['cpu_percent']
+                    group['memory_percent'] += row['memory_percent']
+                    group['io_rate'] += row['io_rate']
+            rows = groups.values()
+            result = heapq.nlargest(limit, rows, key=lambda row: row[key])
+            for group in result:
+                group['cpu_percent'] = round(group['cpu_percent'], 1)
+                group['memory_percent'] = round(group['memory_percent'], 2)
+                group['io_rate'] = round(group['io_rate'], 1)
+            return result
+        return heapq.nlargest(limit, rows, key=lambda row: row[key])
 
-                net_upload_speed = round(upload_bps / (1024 * 1024), 2) 
-                net_download_speed = round(download_bps / (1024 * 1024), 2)
-                logger.info(f"[NET_DEBUG] Hasil: net_upload_speed_MBs={net_upload_speed:.2f}, net_download_speed_MBs={net_download_speed:.2f}")
-            else:
-                logger.warning(f"[NET_DEBUG] time_diff_net ({time_diff_net:.4f}s) terlalu kecil. Kecepatan tidak dihitung.")
-        else:
-            logger.info("[NET_DEBUG] Panggilan pertama atau _prev_net_io/_prev_net_time belum ada.")
-    
-        _prev_net_io = current_net_io
-        _prev_net_time = current_network_sample_time 
-            
-        processes = []
-        # Ambil proses setelah CPU percent dihitung agar lebih akurat
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            try:
-                p_info = proc.info
-                # Pastikan nilai tidak None atau NaN dan merupakan float
-                p_info['cpu_percent'] = p_info['cpu_percent'] if p_info['cpu_percent'] is not None else 0.0
-                p_info['memory_percent'] = p_info['memory_percent'] if p_info['memory_percent'] is not None else 0.0
-                processes.append(p_info)
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass # Abaikan proses yang tidak bisa diakses
-                
-        processes = sorted(processes, key=lambda x: x['cpu_percent'], reverse=True)[:10]
-        
-        system_status_obj = get_system_status(cpu_percent, ram_percent, disk_percent, gpu_info['usage'], cpu_temp)
-        recommendations_list = get_system_recommendations(cpu_percent, ram_percent, disk_percent, gpu_info['usage'], processes)
-
-        response_data = {
-            'cpu': {
-                'percent': cpu_percent,
-                'temperature': cpu_temp, # Bisa 'N/A'
-            },
-            'ram': {
-                'percent': ram_percent,
-                'total': ram_total,
-                'used': ram_used,
-                'free': ram_free,
-            },
-            'disk': {
-                'percent': disk_percent,
-                'total': disk_total,
-                'used': disk_used,
-                'free': disk_free,
-            },
-            'disk_io': disk_io, # {'read': float, 'write': float}
-            'network': {
-                'sent': net_sent_total, # Total sent
-                'recv': net_recv_total, # Total recv
-                'packets_sent': net_packets_sent,
-                'packets_recv': net_packets_recv,
-                'upload_speed': net_upload_speed, # float MB/s
-                'upload_unit': upload_unit, # "MB/s" or "KB/s"
-                'download_speed': net_download_speed, # float MB/s
-                'download_unit': download_unit,   # string "MB/s" atau "KB/s"
-            },
-            'processes': processes,
-            'gpu': {
-                'temperature': gpu_temp, # Bisa 'N/A'
-                'name': gpu_info['name'], # Bisa 'N/A'
-                'usage': gpu_info['usage'], # Selalu float
-                'mem_total': gpu_info['mem_total'], # float
-                'mem_used': gpu_info['mem_used'], # float
-                'mem_free': gpu_info['mem_free'] # float
-            },
-            'battery': battery_info, # percent bisa 'N/A'
-            'system': {
-                'uptime': system_uptime,
-                'status': system_status_obj['status'], # string
-                'status_details': system_status_obj['details'], # list of strings
-                'recommendations': recommendations_list # list of strings
-            }
+
+process_tracker = ProcessTracker()
+
+
+# Histogram latensi dengan bucket eksponensial tetap: observe O(1), tanpa menyimpan sampel
+class LatencyHistogram:
+    BOUNDS = tuple(0.00001 * 2 ** i for i in range(22)) # 10 µs .. ~21 s
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1) # Bucket terakhir: di atas batas tertinggi
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    # Kuantil diperkirakan dengan interpolasi linear di dalam bucket
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                low = self.BOUNDS[index - 1] if index > 0 else 0.0
+                high = self.BOUNDS[index] if index < len(self.BOUNDS) else self.max
+                return min(low + (high - low) * (rank - cumulative) / count, self.max)
+            cumulative += count
+        return self.max
+
+    def summary(self):
+        ms = lambda seconds: round(seconds * 1000, 3)
+        return {
+            'count': self.count,
+            'total_ms': ms(self.total),
+            'mean_ms': ms(self.total / self.count) if self.count else 0.0,
+            'p50_ms': ms(self.quantile(0.5)),
+            'p90_ms': ms(self.quantile(0.9)),
+            'p99_ms': ms(self.quantile(0.99)),
+            'max_ms': ms(self.max),
         }
-        
-        # logger.info("Data monitoring berhasil dibuat")
-        return jsonify(response_data)
-        
-    except Exception as e:
-        logger.exception(f"Error pada /data endpoint") # Menggunakan logger.exception untuk stack trace
-        return jsonify({'error': str(e)}), 500
 
-if __name__ == '__main__':
-    logger.info("Aplikasi monitoring dimulai")
-    # Nonaktifkan reloader Flask saat debug=True untuk menghindari reset global var state (opsional, tapi bisa membantu utk _prev_ vars)
-    # use_reloader=False penting saat debug variabel global
-    app.run(debug=True, host='0.0.0.0', use_reloader=False if os.environ.get("WERKZEUG_RUN_MAIN") == "true" else True)
\ No newline at end of file
+
+# Timer internal monitor sendiri: collector, handler HTTP, dan serialisasi
+class PerfStats:
+    def __init__(self):
+        self._histograms = defaultdict(LatencyHistogram)
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self._histograms[name].observe(seconds)
+
+    def summary(self):
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+perf = PerfStats()
+self_process = psutil.Process() # Proses monitor ini, untuk melaporkan overhead-nya sendiri
+
+
+# Registry collector: nama -> (fungsi, dependensi, interval). Fungsi menerima dict hasil collector yang sudah jalan.
+# Nama berawalan '_' adalah hasil antara dan tidak dikirim ke client. interval None = setiap sampel; selain itu
+# hasil terakhir dipakai ulang sampai interval (detik) lewat. Bisa diubah lewat MONITOR_COLLECTOR_INTERVALS,
+# mis. "processes=2,battery=120".
+COLLECTORS = {}
+
+
+# Entri yang salah format dicatat dan dilewati, collector tersebut tetap memakai interval bawaan decorator
+def parse_collector_intervals(spec):
+    overrides = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        name, _, value = item.partition('=')
+        try:
+            interval = float(value)
+            if not name.strip() or not math.isfinite(interval) or interval < 0:
+                raise ValueError
+        except ValueError:
+            sampler_logger.warning("Entri MONITOR_COLLECTOR_INTERVALS tidak valid dilewati: %r", item.strip())
+            continue
+        overrides[name.strip()] = interval
+    return overrides
+
+
+COLLECTOR_INTERVAL_OVERRIDES = parse_collector_intervals(os.environ.get('MONITOR_COLLECTOR_INTERVALS', ''))
+
+
+def collector(name, requires=(), interval=None):
+    def decorator(fn):
+        COLLECTORS[name] = (fn, tuple(requires), COLLECTOR_INTERVAL_OVERRIDES.get(name, interval) or None)
+        return fn
+    return decorator
+
+
+@collector('_temperatures', interval=5.0)
+def _collect_temperatures(results):
+    return get_temperatures()
+
+
+@collector('_gpu_info')
+def _collect_gpu_info(results):
+    return get_gpu_info() # Pastikan usage selalu float
+
+
+@collector('cpu', requires=('_temperatures',))
+def _collect_cpu(results):
+    # interval=None: non-blocking, dihitung terhadap panggilan sebelumnya (cadence sampler)
+    return {
+        'percent': psutil.cpu_percent(interval=None),
+        'temperature': results['_temperatures'][0], # Bisa 'N/A'
+    }
+
+
+@collector('ram')
+def _collect_ram(results):
+    ram = psutil.virtual_memory()
+    return {
+        'percent': ram.percent,
+        'total': bytes_to_gb(ram.total),
+        'used': bytes_to_gb(ram.used),
+        'free': bytes_to_gb(ram.available),
+        'total_bytes': ram.total, # Nilai mentah untuk /metrics dan konsumen mesin
+        'used_bytes': ram.used,
+        'free_bytes': ram.available,
+    }
+
+
+@collector('disk', interval=10.0)
+def _collect_disk(results):
+    disk_usage_obj = psutil.disk_usage('/') # Menggunakan objek disk_usage agar lebih jelas
+    return {
+        'percent': disk_usage_obj.percent,
+        'total': bytes_to_gb(disk_usage_obj.total),
+        'used': bytes_to_gb(disk_usage_obj.used),
+        'free': bytes_to_gb(disk_usage_obj.free),
+        'total_bytes': disk_usage_obj.total, # Nilai mentah untuk /metrics dan konsumen mesin
+        'used_bytes': disk_usage_obj.used,
+        'free_bytes': disk_usage_obj.free,
+    }
+
+
+# Semua mount (bukan hanya '/'); hasil cache per mount, mount yang macet ditandai lewat 'status'
+@collector('filesystems')
+def _collect_filesystems(results):
+    return mount_monitor.refresh()
+
+
+@collector('disk_io')
+def _collect_disk_io(results):
+    return get_disk_io_rates() # {'read', 'write', 'read_iops', 'write_iops', 'devices'}
+
+
+@collector('network')
+def _collect_network(results):
+    return get_network_rates() # Laju total dan per interface
+
+
+# Ambil proses setelah CPU percent dihitung agar lebih akurat
+@collector('processes', requires=('cpu',))
+def _collect_processes(results):
+    process_tracker.refresh()
+    return process_tracker.top(10)
+
+
+@collector('gpu', requires=('_temperatures', '_gpu_info'))
+def _collect_gpu(results):
+    gpu_temp = results['_temperatures'][1]
+    gpu_info = results['_gpu_info']
+    return {
+        'temperature': gpu_temp if gpu_temp != 'N/A' else gpu_info['temperature'], # Bisa 'N/A'
+        'name': gpu_info['name'], # Bisa 'N/A'
+        'usage': gpu_info['usage'], # Selalu float
+        'mem_total': gpu_info['mem_total'], # float
+        'mem_used': gpu_info['mem_used'], # float
+        'mem_free': gpu_info['mem_free'], # float
+        'gpus': gpu_info['gpus'], # Semua GPU, masing-masing dengan field yang sama
+    }
+
+
+@collector('battery', interval=60.0)
+def _collect_battery(results):
+    return get_battery_info() # Pastikan percent selalu angka atau 'N/A'
+
+
+@collector('system.uptime')
+def _collect_uptime(results):
+    return {'uptime': get_system_uptime()}
+
+
+@collector('system.status', requires=('cpu', 'ram', 'disk', 'gpu'))
+def _collect_status(results):
+    # Alert dievaluasi sekali per sampel di sini; field ini selalu dikumpulkan (lihat field_demand)
+    alert_engine.evaluate(results)
+    status_obj = alert_engine.system_status()
+    return {
+        'status': status_obj['status'], # string
+        'status_details': status_obj['details'], # list of strings
+    }
+
+
+# Statistik streaming (baseline EWMA, anomali, tren, ETA disk penuh); selalu dikumpulkan agar baseline tidak berlubang
+@collector('stats', requires=('cpu', 'ram', 'disk', 'gpu', 'network', 'disk_io'))
+def _collect_stats(results):
+    return stats_engine.update(time.time(), results)
+
+
+@collector('system.recommendations', requires=('cpu', 'ram', 'disk', 'gpu', 'processes', 'stats'))
+def _collect_recommendations(results):
+    return {'recommendations': get_system_recommendations(
+        results['cpu']['percent'], results['ram']['percent'], results['disk']['percent'],
+        results['gpu']['usage'], results['processes'], results['stats'])} # list of strings
+
+
+# Field yang boleh diminta lewat ?fields=; 'system' adalah gabungan semua collector system.*
+SYSTEM_FIELDS = tuple(name for name in COLLECTORS if name.startswith('system.'))
+ALL_FIELDS = tuple(name for name in COLLECTORS if not name.startswith(('_', 'system.'))) + ('system',)
+
+
+# Ubah daftar field menjadi urutan collector yang perlu dijalankan (dependensi lebih dulu)
+def resolve_collectors(fields):
+    names = []
+    for field in fields:
+        names.extend(SYSTEM_FIELDS if field == 'system' else (field,))
+    ordered = []
+    visiting = set()
+
+    def visit(name):
+        if name in ordered:
+            return
+        if name not in COLLECTORS:
+            raise KeyError(name)
+        if name in visiting:
+            raise ValueError(f"Dependensi collector melingkar di '{name}'")
+        visiting.add(name)
+        for dependency in COLLECTORS[name][1]:
+            visit(dependency)
+        visiting.discard(name)
+        ordered.append(name)
+
+    for name in names:
+        visit(name)
+    return ordered
+
+
+_collector_cache = {} # nama -> (waktu monotonic, hasil) untuk collector dengan interval sendiri
+_collector_shapes = {} # nama -> tipe hasil terakhir yang berhasil (dict/list), untuk section kosong saat gagal
+SCHEDULE_SLACK = 0.1 # Toleransi jitter tick agar collector 5s tidak tergeser ke tick ke-6
+
+
+# Section pengganti untuk collector yang gagal: bentuknya sama dengan hasil normal agar client tidak rusak
+def _empty_section(name):
+    if name in SYSTEM_FIELD_KEYS:
+        return {key: 'N/A' for key in SYSTEM_FIELD_KEYS[name]}
+    return _collector_shapes.get(name, dict)()
+
+
+# Kumpulkan satu sampel untuk field yang diminta (default semua). Dipanggil oleh thread sampler.
+def collect_snapshot(fields=ALL_FIELDS):
+    results = {}
+    failed = set()
+    now = time.monotonic()
+    for name in resolve_collectors(fields):
+        fn, requires, interval = COLLECTORS[name]
+        cached = _collector_cache.get(name)
+        if interval and cached is not None and now - cached[0] < interval - SCHEDULE_SLACK:
+            results[name] = cached[1] # Hasil tidak pernah diubah setelah dipublikasikan, aman dipakai ulang
+            continue
+        # Satu collector yang gagal hanya mengosongkan section-nya (dan yang bergantung padanya), bukan seluruh sampel
+        if failed.intersection(requires):
+            failed.add(name)
+            results[name] = _empty_section(name)
+            continue
+        started = time.perf_counter()
+        try:
+            results[name] = fn(results)
+        except Exception:
+            sampler_logger.exception("Collector %s gagal", name)
+            failed.add(name)
+            results[name] = _empty_section(name)
+            continue
+        finally:
+            perf.observe(f"collector.{name}", time.perf_counter() - started)
+        if isinstance(results[name], (dict, list)):
+            _collector_shapes[name] = type(results[name])
+        if interval:
+            _collector_cache[name] = (now, results[name])
+
+    response_data = {}
+    for name, value in results.items():
+        if name.startswith('_'):
+            continue
+        if name.startswith('system.'):
+            response_data.setdefault('system', {}).update(value)
+        else:
+            response_data[name] = value
+    return response_data
+
+
+# Key di dalam data['system'] yang dihasilkan setiap collector system.*
+SYSTEM_FIELD_KEYS = {
+    'system.uptime': ('uptime',),
+    'system.status': ('status', 'status_details'),
+    'system.recommendations': ('recommendations',),
+}
+
+
+# Apakah data snapshot sudah memuat field tertentu
+def snapshot_has_field(data, field):
+    if field == 'system':
+        return all(snapshot_has_field(data, name) for name in SYSTEM_FIELDS)
+    if field in SYSTEM_FIELD_KEYS:
+        return SYSTEM_FIELD_KEYS[field][0] in data.get('system', {})
+    return field in data
+
+
+# Potong data snapshot menjadi field yang diminta saja
+def select_fields(data, fields):
+    selected = {}
+    for field in fields:
+        if field in SYSTEM_FIELD_KEYS:
+            system = data.get('system', {})
+            selected.setdefault('system', {}).update(
+                {key: system[key] for key in SYSTEM_FIELD_KEYS[field] if key in system})
+        elif field in data:
+            selected[field] = data[field]
+    return selected
+
+
+# Snapshot hasil sampling. Tidak pernah diubah setelah dipublikasikan.
+# body: data yang sudah diencode untuk /data (hanya di worker shared memory), None jika belum ada
+Snapshot = namedtuple('Snapshot', ['seq', 'timestamp', 'data', 'body'], defaults=(None,))
+
+
+# Thread kolektor tunggal: sampling dengan cadence tetap, /data hanya membaca snapshot terakhir
+class MetricsSampler:
+    def __init__(self, collect_fn, interval=1.0, idle_interval=None, idle_fn=None):
+        self.collect_fn = collect_fn
+        self.interval = interval
+        self.idle_interval = idle_interval # Heartbeat saat tidak ada client; None = selalu interval penuh
+        self.idle_fn = idle_fn
+        self.idle = False
+        self._snapshot = None # Diganti utuh (assignment atomik), pembaca tidak perlu lock
+        self._seq = 0
+        self._ready = threading.Event()
+        self._published = threading.Condition()
+        self._stop = threading.Event()
+        self._wake = threading.Event() # Memicu sampling lebih awal dari jadwal
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._listeners = [] # Dipanggil dengan setiap snapshot baru, di thread sampler
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='metrics-sampler', daemon=True)
+            self._thread.start()
+            sampler_logger.info("Sampler dimulai, interval %ss", self.interval)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def sample_once(self):
+        started = time.perf_counter()
+        data = self.collect_fn()
+        perf.observe('sampler.collect', time.perf_counter() - started)
+        self._seq += 1
+        snapshot = Snapshot(self._seq, time.time(), data)
+        self._snapshot = snapshot
+        self._ready.set()
+        with self._published:
+            self._published.notify_all()
+        for listener in self._listeners:
+            name = getattr(listener, '__qualname__', repr(listener))
+            started = time.perf_counter()
+            try:
+                listener(snapshot)
+            except Exception:
+                sampler_logger.exception("Error pada listener snapshot %s", name)
+            perf.observe(f"listener.{name}", time.perf_counter() - started)
+        return snapshot
+
+    def _check_idle(self):
+        idle = bool(self.idle_interval and self.idle_fn is not None and self.idle_fn())
+        if idle != self.idle:
+            self.idle = idle
+            if idle:
+                sampler_logger.info("Tidak ada client aktif, sampling melambat ke %ss", self.idle_interval)
+            else:
+                sampler_logger.info("Client aktif, sampling kembali tiap %ss", self.interval)
+        return idle
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.sample_once()
+            except Exception:
+                sampler_logger.exception("Error saat sampling metrik")
+            # Jadwal berbasis tick tetap supaya durasi sampling tidak menggeser cadence
+            idle = self._check_idle()
+            next_tick += self.idle_interval if idle else self.interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                next_tick = time.monotonic()
+                delay = 0
+            # Saat idle, permintaan client tetap diperiksa setiap interval normal agar dashboard yang baru
+            # terhubung (termasuk lewat worker lain) langsung mendapat cadence penuh
+            while delay > 0 and not self._stop.is_set():
+                if self._wake.wait(min(delay, self.interval)):
+                    self._wake.clear()
+                    next_tick = time.monotonic()
+                    break
+                if idle and not self._check_idle():
+                    next_tick = time.monotonic()
+                    break
+                delay = next_tick - time.monotonic()
+
+    # Minta sampel berikutnya diambil segera (mis. ada field baru yang diminta client)
+    def request_sample(self):
+        self._wake.set()
+
+    # Tunggu snapshot dengan seq lebih baru dari seq; mengembalikan snapshot terakhir
+    def wait_newer(self, seq, timeout):
+        deadline = time.monotonic() + timeout
+        with self._published:
+            while self._snapshot is None or self._snapshot.seq <= seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._published.wait(remaining)
+        return self._snapshot
+
+    def latest(self, wait_timeout=None):
+        if self._snapshot is None and wait_timeout:
+            self._ready.wait(wait_timeout)
+        return self._snapshot
+
+
+# Field yang diminta client dalam jendela waktu terakhir; sampler hanya mengumpulkan field ini
+class FieldDemand:
+    def __init__(self, base_fields=(), ttl=30.0, idle_after=60.0):
+        self.base_fields = tuple(base_fields) # Selalu dikumpulkan (riwayat, store, stream)
+        self.ttl = ttl
+        self.idle_after = idle_after # Tanpa permintaan selama ini, sampler turun ke heartbeat
+        self._last_seen = {}
+        self._last_touch = None
+        self._lock = threading.Lock()
+
+        self.shared = None # SharedSnapshotSegment: permintaan dari worker lain (mode serve)
+
+    # Catat permintaan; True jika ada field yang sebelumnya tidak sedang dikumpulkan, atau sampler sedang idle
+    def touch(self, fields):
+        now = time.monotonic()
+        with self._lock:
+            new_field = any(field not in self.base_fields and now - self._last_seen.get(field, -self.ttl) >= self.ttl
+                            for field in fields)
+            was_idle = self._last_touch is None or now - self._last_touch >= self.idle_after
+            self._last_touch = now
+            for field in fields:
+                self._last_seen[field] = now
+        if self.shared is not None:
+            self.shared.touch(fields)
+        return new_field or was_idle
+
+    def idle_seconds(self):
+        idle = time.monotonic() - self._last_touch if self._last_touch is not None else float('inf')
+        if self.shared is not None:
+            last = self.shared.last_touch()
+            if last:
+                idle = min(idle, time.time() - last)
+        return idle
+
+    def idle(self):
+        return self.idle_seconds() >= self.idle_after
+
+    def active_fields(self):
+        now = time.monotonic()
+        with self._lock:
+            recent = [field for field, seen in self._last_seen.items() if now - seen < self.ttl]
+        if self.shared is not None:
+            recent.extend(self.shared.recent(self.ttl))
+        return tuple(dict.fromkeys(self.base_fields + tuple(recent)))
+
+
+# Field yang dipakai riwayat dan store selalu dikumpulkan; system.status menjalankan rules engine alert,
+# stats memperbarui baseline streaming
+field_demand = FieldDemand(base_fields=('cpu', 'ram', 'disk', 'disk_io', 'network', 'gpu', 'stats', 'system.status'),
+                           idle_after=float(os.environ.get('MONITOR_IDLE_AFTER', '60')))
+
+
+def collect_demanded_snapshot():
+    fields = field_demand.active_fields()
+    if 'processes.io' in fields:
+        process_tracker.request_io()
+        fields = tuple(field for field in fields if field != 'processes.io')
+    return collect_snapshot(fields)
+
+
+# Panggilan pertama cpu_percent(interval=None) selalu 0.0, jadi dipancing saat import
+psutil.cpu_percent(interval=None)
+# Tanpa client selama MONITOR_IDLE_AFTER detik, sampling turun ke heartbeat MONITOR_IDLE_INTERVAL (0 = nonaktif)
+sampler = MetricsSampler(collect_demanded_snapshot, interval=float(os.environ.get('MONITOR_SAMPLE_INTERVAL', '1.0')),
+                         idle_interval=float(os.environ.get('MONITOR_IDLE_INTERVAL', '30')) or None,
+                         idle_fn=field_demand.idle)
+
+
+# Riwayat metrik di memori: ring buffer kapasitas tetap berbasis array NumPy, tanpa dict per titik
+class MetricHistory:
+    METRICS = ('cpu', 'ram', 'disk', 'gpu', 'net_upload', 'net_download', 'disk_read', 'disk_write')
+
+    def __init__(self, capacity, metrics=METRICS):
+        self.capacity = capacity
+        self.metrics = tuple(metrics)
+        self._row = {metric: i for i, metric in enumerate(self.metrics)}
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._values = np.full((len(self.metrics), capacity), np.nan, dtype=np.float64)
+        self._head = 0 # Posisi tulis berikutnya
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    # Timestamp sampel tertua yang masih ada di buffer (None jika kosong)
+    def oldest(self):
+        with self._lock:
+            if self._count == 0:
+                return None
+            return float(self._timestamps[self._head if self._count == self.capacity else 0])
+
+    def append(self, timestamp, values):
+        with self._lock:
+            self._timestamps[self._head] = timestamp
+            for metric, row in self._row.items():
+                value = values.get(metric)
+                self._values[row, self._head] = value if isinstance(value, (int, float)) else np.nan
+            self._head = (self._head + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    # Salinan kronologis (timestamps, values) untuk satu metrik dalam rentang [start, end]
+    def window(self, metric, start=None, end=None):
+        row = self._row[metric]
+        with self._lock:
+            if self._count < self.capacity:
+                timestamps = self._timestamps[:self._count].copy()
+                values = self._values[row, :self._count].copy()
+            else:
+                timestamps = np.concatenate((self._timestamps[self._head:], self._timestamps[:self._head]))
+                values = np.concatenate((self._values[row, self._head:], self._values[row, :self._head]))
+        lo = np.searchsorted(timestamps, start, side='left') if start is not None else 0
+        hi = np.searchsorted(timestamps, end, side='right') if end is not None else len(timestamps)
+        return timestamps[lo:hi], values[lo:hi]
+
+
+# Penyimpanan time-series di disk: SQLite WAL, satu tabel per segmen waktu per tier.
+# Retensi dilakukan dengan DROP TABLE segmen lama, bukan DELETE per baris.
+class TimeSeriesStore:
+    # (nama tier, resolusi detik, panjang segmen detik)
+    TIERS = (('raw', 1, 3600), ('1m', 60, 86400), ('1h', 3600, 30 * 86400))
+    DEFAULT_RETENTION = {'raw': 6 * 3600, '1m': 7 * 86400, '1h': 365 * 86400}
+    TABLE_PREFIX = {'raw': 'raw', '1m': 'm1', '1h': 'h1'}
+
+    def __init__(self, path, metrics, retention=None, flush_interval=10.0, max_rows=5000):
+        self.path = path
+        self.metrics = tuple(metrics)
+        self.retention = dict(self.DEFAULT_RETENTION, **(retention or {}))
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows # Batas baris per query, menentukan tier otomatis
+        self._tier_info = {name: (resolution, segment) for name, resolution, segment in self.TIERS}
+        self._pending = {name: [] for name, _, _ in self.TIERS}
+        self._buckets = {} # tier rollup -> [bucket_start, counts, sums, mins, maxs]
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._known_tables = set()
+        self._checked_tables = set() # Tabel yang skemanya sudah dicek pada proses ini
+        self._local = threading.local()
+        self._write_conn = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        # auto_vacuum harus diset sebelum tabel pertama dibuat agar DROP TABLE bisa mengembalikan ruang
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def start(self):
+        if self._thread is not None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._write_conn = self._connect()
+        self._known_tables = set(self._list_tables(self._write_conn))
+        self._thread = threading.Thread(target=self._run, name='tsdb-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        store_logger.info("Time-series store aktif: %s", self.path)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.flush_interval + 5)
+        # Bucket rollup yang masih terbuka ikut ditulis; setelah restart digabung dengan baris yang sama
+        with self._lock:
+            for tier, bucket in self._buckets.items():
+                self._pending[tier].append(self._close_bucket(bucket))
+            self._buckets = {}
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                store_logger.exception("Gagal menulis ke time-series store")
+
+    def _columns(self, tier):
+        if tier == 'raw':
+            return list(self.metrics)
+        return [f"{metric}_{agg}" for metric in self.metrics for agg in ('min', 'avg', 'max', 'count')]
+
+    def _table_name(self, tier, timestamp):
+        segment = self._tier_info[tier][1]
+        return f"{self.TABLE_PREFIX[tier]}_{int(timestamp - timestamp % segment)}"
+
+    @staticmethod
+    def _list_tables(conn):
+        return [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+
+    # Dipanggil dari thread sampler: hanya menambah ke buffer memori dan akumulator rollup
+    def add(self, timestamp, values):
+        row = [values.get(metric) for metric in self.metrics]
+        row = [float(v) if isinstance(v, (int, float)) else None for v in row]
+        with self._lock:
+            self._pending['raw'].append((timestamp, row))
+            for tier in ('1m', '1h'):
+                self._accumulate(tier, timestamp, row)
+
+    def _accumulate(self, tier, timestamp, row):
+        resolution = self._tier_info[tier][0]
+        bucket_start = timestamp - timestamp % resolution
+        bucket = self._buckets.get(tier)
+        if bucket is not None and bucket[0] != bucket_start:
+            self._pending[tier].append(self._close_bucket(bucket))
+            bucket = None
+        if bucket is None:
+            size = len(self.metrics)
+            bucket = [bucket_start, [0] * size, [0.0] * size, [None] * size, [None] * size]
+            self._buckets[tier] = bucket
+        _, counts, sums, mins, maxs = bucket
+        for i, value in enumerate(row):
+            if value is None:
+                continue
+            counts[i] += 1
+            sums[i] += value
+            mins[i] = value if mins[i] is None else min(mins[i], value)
+            maxs[i] = value if maxs[i] is None else max(maxs[i], value)
+
+    @staticmethod
+    def _close_bucket(bucket):
+        bucket_start, counts, sums, mins, maxs = bucket
+        row = []
+        for count, total, low, high in zip(counts, sums, mins, maxs):
+            row.extend((low, total / count if count else None, high, count))
+        return bucket_start, row
+
+    # Gabungkan baris rollup baru dengan baris yang sudah ada untuk bucket yang sama (mis. sebelum restart)
+    @staticmethod
+    def _merge_rollup(existing, row):
+        merged = []
+        for i in range(0, len(row), 4):
+            old_min, old_avg, old_max, old_count = existing[i:i + 4]
+            new_min, new_avg, new_max, new_count = row[i:i + 4]
+            if old_avg is None:
+                merged.extend(row[i:i + 4])
+                continue
+            if new_avg is None:
+                merged.extend(existing[i:i + 4])
+                continue
+            old_count = old_count or 1 # Baris lama tanpa kolom count dihitung satu sampel
+            count = old_count + new_count
+            merged.extend((min(old_min, new_min), (old_avg * old_count + new_avg * new_count) / count,
+                           max(old_max, new_max), count))
+        return merged
+
+    def _ensure_table(self, conn, table, columns):
+        if table not in self._known_tables:
+            column_defs = ', '.join(f"{column} REAL" for column in columns)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (ts REAL PRIMARY KEY, {column_defs})")
+            self._known_tables.add(table)
+        if table not in self._checked_tables:
+            # Segmen dari versi lama belum punya kolom count
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column in columns:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} REAL")
+            self._checked_tables.add(table)
+
+    # Tulis semua baris tertunda dalam satu transaksi, lalu pangkas segmen kedaluwarsa
+    def flush(self):
+        if self._write_conn is None:
+            return
+        with self._lock:
+            pending = self._pending
+            self._pending = {name: [] for name, _, _ in self.TIERS}
+
+        with self._write_lock:
+            conn = self._write_conn
+            with conn:
+                for tier, rows in pending.items():
+                    if not rows:
+                        continue
+                    columns = self._columns(tier)
+                    by_table = defaultdict(list)
+                    for timestamp, row in rows:
+                        by_table[self._table_name(tier, timestamp)].append((timestamp, *row))
+                    for table, table_rows in by_table.items():
+                        self._ensure_table(conn, table, columns)
+                        if tier != 'raw':
+                            select = ', '.join(columns)
+                            for index, (timestamp, *row) in enumerate(table_rows):
+                                existing = conn.execute(f"SELECT {select} FROM {table} WHERE ts = ?", (timestamp,)).fetchone()
+                                if existing is not None:
+                                    table_rows[index] = (timestamp, *self._merge_rollup(existing, row))
+                        placeholders = ', '.join('?' * (len(columns) + 1))
+                        conn.executemany(f"INSERT OR REPLACE INTO {table} (ts, {', '.join(columns)}) VALUES ({placeholders})",
+                                         table_rows)
+            self.prune(conn)
+
+    def prune(self, conn, now=None):
+        now = time.time() if now is None else now
+        dropped = []
+        for tier, _, segment in self.TIERS:
+            prefix = self.TABLE_PREFIX[tier] + '_'
+            cutoff = now - self.retention[tier]
+            for table in list(self._known_tables):
+                if table.startswith(prefix) and int(table[len(prefix):]) + segment <= cutoff:
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                    self._known_tables.discard(table)
+                    dropped.append(table)
+        if dropped:
+            conn.execute('PRAGMA incremental_vacuum')
+            store_logger.info("%d segmen time-series kedaluwarsa dihapus", len(dropped))
+        return dropped
+
+    # Tier paling halus yang masih menyimpan awal rentang dan tidak melebihi max_rows
+    def choose_tier(self, start, end):
+        now = time.time()
+        for tier, resolution, _ in self.TIERS:
+            if start >= now - self.retention[tier] and (end - start) / resolution <= self.max_rows:
+                return tier
+        return self.TIERS[-1][0]
+
+    def _read_conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def query(self, metric, start, end=None, tier='auto'):
+        end = time.time() if end is None else end
+        if tier == 'auto':
+            tier = self.choose_tier(start, end)
+        resolution, segment = self._tier_info[tier]
+        prefix = self.TABLE_PREFIX[tier] + '_'
+        conn = self._read_conn()
+        # Hanya segmen yang beririsan dengan rentang yang dibaca
+        tables = sorted(
+            table for table in self._list_tables(conn)
+            if table.startswith(prefix) and int(table[len(prefix):]) <= end
+            and int(table[len(prefix):]) + segment > start
+        )
+        if tier == 'raw':
+            select = f"ts, {metric}, {metric}, {metric}"
+        else:
+            select = f"ts, {metric}_min, {metric}_avg, {metric}_max"
+        rows = []
+        for table in tables:
+            rows.extend(conn.execute(f"SELECT {select} FROM {table} WHERE ts >= ? AND ts <= ? ORDER BY ts", (start, end)))
+        data = np.array(rows, dtype=np.float64).reshape(-1, 4) if rows else np.empty((0, 4))
+        return {
+            'tier': tier,
+            'resolution': resolution,
+            'timestamps': data[:, 0],
+            'min': data[:, 1],
+            'values': data[:, 2],
+            'max': data[:, 3],
+        }
+
+
+# Ambil nilai numerik yang direkam ke riwayat dari satu snapshot /data
+def history_values(data):
+    network = data.get('network', {})
+    disk_io = data.get('disk_io', {})
+    return {
+        'cpu': data.get('cpu', {}).get('percent'), # Section bisa kosong jika collector-nya gagal
+        'ram': data.get('ram', {}).get('percent'),
+        'disk': data.get('disk', {}).get('percent'),
+        'gpu': data.get('gpu', {}).get('usage'),
+        'net_upload': network.get('upload_bps'), # Byte/s
+        'net_download': network.get('download_bps'),
+        'disk_read': disk_io.get('read'), # MB/s
+        'disk_write': disk_io.get('write'),
+    }
+
+
+# Downsampling min/max per bucket: mempertahankan puncak dan lembah, sepenuhnya vectorized
+def downsample_minmax(timestamps, values, points):
+    n = len(values)
+    buckets = max(1, points // 2)
+    if n <= points or n < 2 * buckets:
+        return timestamps, values
+    # Sisa titik terlama dibuang agar setiap bucket sama lebar (bisa di-reshape)
+    width = n // buckets
+    usable = width * buckets
+    ts = timestamps[n - usable:].reshape(buckets, width)
+    vals = values[n - usable:].reshape(buckets, width)
+    filled = np.where(np.isnan(vals), np.inf, vals)
+    min_idx = np.argmin(filled, axis=1)
+    filled = np.where(np.isnan(vals), -np.inf, vals)
+    max_idx = np.argmax(filled, axis=1)
+    # Urutkan pasangan min/max menurut waktu di dalam bucket
+    first = np.minimum(min_idx, max_idx)
+    second = np.maximum(min_idx, max_idx)
+    rows = np.arange(buckets)
+    out_idx = np.empty((buckets, 2), dtype=np.int64)
+    out_idx[:, 0], out_idx[:, 1] = first, second
+    out_ts = ts[rows[:, None], out_idx].ravel()
+    out_vals = vals[rows[:, None], out_idx].ravel()
+    return out_ts, out_vals
+
+
+# Largest-Triangle-Three-Buckets: bentuk grafik tetap terjaga dengan jumlah titik tetap
+def downsample_lttb(timestamps, values, points):
+    n = len(values)
+    if points >= n or points < 3:
+        return timestamps, values
+    values_filled = np.nan_to_num(values)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_t = timestamps[end:next_end].mean() if next_end > end else timestamps[-1]
+        avg_v = values_filled[end:next_end].mean() if next_end > end else values_filled[-1]
+        bucket_t = timestamps[start:end]
+        bucket_v = values_filled[start:end]
+        areas = np.abs((timestamps[prev] - avg_t) * (bucket_v - values_filled[prev])
+                       - (timestamps[prev] - bucket_t) * (avg_v - values_filled[prev]))
+        prev = start + int(np.argmax(areas))
+        selected[i + 1] = prev
+    return timestamps[selected], values[selected]
+
+
+DOWNSAMPLERS = {'minmax': downsample_minmax, 'lttb': downsample_lttb}
+
+history = MetricHistory(capacity=int(os.environ.get('MONITOR_HISTORY_SECONDS', '86400')))
+
+
+def record_history(snapshot):
+    history.append(snapshot.timestamp, history_values(snapshot.data))
+
+
+sampler.add_listener(record_history)
+
+# Simpan ke disk kecuali MONITOR_DB_PATH diset kosong
+DB_PATH = os.environ.get('MONITOR_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metrics.db'))
+store = TimeSeriesStore(DB_PATH, MetricHistory.METRICS) if DB_PATH else None
+
+
+def record_store(snapshot):
+    if store._thread is None:
+        store.start()
+    store.add(snapshot.timestamp, history_values(snapshot.data))
+
+
+if store is not None:
+    sampler.add_listener(record_store)
+
+
+# Half-life baseline (MONITOR_STATS_HALFLIFE) dan tren (MONITOR_TREND_HALFLIFE), dalam detik
+stats_engine = StreamingStats(MetricHistory.METRICS,
+                              halflife=float(os.environ.get('MONITOR_STATS_HALFLIFE', '300')),
+                              trend_halflife=float(os.environ.get('MONITOR_TREND_HALFLIFE', '3600')),
+                              z_threshold=float(os.environ.get('MONITOR_ANOMALY_Z', '3.0')))
+
+
+
+# Server-Sent Events: setiap snapshot diserialisasi sekali, byte yang sama dikirim ke semua subscriber
+class StreamBroadcaster:
+    FORMATS = ('json', 'compact')
+    COMPACT_FIELDS = ('timestamp',) + MetricHistory.METRICS
+
+    def __init__(self, replay=60, max_lag=5, heartbeat=15.0, retry_ms=3000):
+        self.max_lag = max_lag # Subscriber yang tertinggal lebih dari ini langsung lompat ke frame terbaru
+        self.heartbeat = heartbeat
+        self.retry_ms = retry_ms
+        self._frames = deque(maxlen=replay) # (seq, {format: bytes}) untuk resume via Last-Event-ID
+        self._cond = threading.Condition()
+        self._subscribers = 0
+
+    @property
+    def subscribers(self):
+        return self._subscribers
+
+    # Setiap format diencode sekali per sampel; compact hanya berisi angka dalam urutan COMPACT_FIELDS
+    def publish(self, snapshot):
+        # Di worker shared memory body /data dipakai ulang (JSON satu baris, tanpa newline di dalamnya)
+        if snapshot.body is not None:
+            payload = snapshot.body.rstrip(b'\n')
+        else:
+            payload = json.dumps(snapshot.data, separators=(',', ':')).encode('utf-8')
+        values = history_values(snapshot.data)
+        compact = json.dumps([round(snapshot.timestamp, 3)] + [values[name] for name in MetricHistory.METRICS],
+                             separators=(',', ':'))
+        frames = {
+            'json': f"id: {snapshot.seq}\nevent: sample\ndata: ".encode('utf-8') + payload + b"\n\n",
+            'compact': f"id: {snapshot.seq}\nevent: sample\ndata: {compact}\n\n".encode('utf-8'),
+        }
+        with self._cond:
+            self._frames.append((snapshot.seq, frames))
+            self._cond.notify_all()
+
+    # Frame setelah last_seq; jika tertinggal terlalu jauh (atau seq tidak dikenal) hanya frame terakhir
+    def _pending_frames(self, last_seq):
+        if not self._frames:
+            return []
+        latest_seq = self._frames[-1][0]
+        oldest_seq = self._frames[0][0]
+        if last_seq is None or last_seq > latest_seq or last_seq < oldest_seq - 1 or latest_seq - last_seq > self.max_lag:
+            return [self._frames[-1]]
+        return [item for item in self._frames if item[0] > last_seq]
+
+    def subscribe(self, last_seq=None, fmt='json'):
+        with self._cond:
+            self._subscribers += 1
+        try:
+            yield f"retry: {self.retry_ms}\n\n".encode('utf-8')
+            if fmt == 'compact':
+                yield f"event: schema\ndata: {json.dumps(list(self.COMPACT_FIELDS), separators=(',', ':'))}\n\n".encode('utf-8')
+            while True:
+                with self._cond:
+                    frames = self._pending_frames(last_seq)
+                    if not frames:
+                        self._cond.wait(self.heartbeat)
+                        frames = self._pending_frames(last_seq)
+                if not frames:
+                    yield b": ping\n\n" # Jaga koneksi tetap hidup lewat proxy
+                    continue
+                for seq, frame in frames:
+                    # yield memblok selama socket penuh; frame yang terlewat dilompati pada putaran berikutnya
+                    yield frame[fmt]
+                    last_seq = seq
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+
+
+broadcaster = StreamBroadcaster()
+sampler.add_listener(broadcaster.publish)
+
+
+
+# Eksposisi OpenMetrics: payload dirender sekali per sampel di thread sampler, dipakai ulang oleh semua scrape
+class OpenMetricsExporter:
+    CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+    def __init__(self, prefix='monitor'):
+        self.prefix = prefix
+        self._payload = None # (seq, bytes)
+        self._rendered = threading.Condition()
+
+    @staticmethod
+    def _escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    @staticmethod
+    def _number(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and value == value
+
+    def _family(self, lines, name, metric_type, help_text, samples, unit=None):
+        # samples: list (labels dict, nilai); nilai non-numerik ('N/A') dilewati
+        samples = [(labels, value) for labels, value in samples if self._number(value)]
+        if not samples:
+            return
+        family = f"{self.prefix}_{name}"
+        lines.append(f"# TYPE {family} {metric_type}")
+        if unit:
+            lines.append(f"# UNIT {family} {unit}")
+        lines.append(f"# HELP {family} {help_text}")
+        suffix = '_total' if metric_type == 'counter' else ''
+        for labels, value in samples:
+            label_text = ','.join(f'{key}="{self._escape(val)}"' for key, val in labels.items())
+            lines.append(f"{family}{suffix}{{{label_text}}} {value}" if label_text else f"{family}{suffix} {value}")
+
+    def render(self, snapshot):
+        data = snapshot.data
+        lines = []
+        family = lambda *args, **kwargs: self._family(lines, *args, **kwargs)
+        none = {}
+
+        family('sample_timestamp_seconds', 'gauge', 'Waktu sampel terakhir', [(none, round(snapshot.timestamp, 3))], unit='seconds')
+        cpu = data.get('cpu', {})
+        family('cpu_usage_percent', 'gauge', 'Penggunaan CPU', [(none, cpu.get('percent'))])
+        ram = data.get('ram', {})
+        family('memory_usage_percent', 'gauge', 'Penggunaan RAM', [(none, ram.get('percent'))])
+        family('memory_bytes', 'gauge', 'Kapasitas RAM', [
+            ({'state': state}, ram.get(f"{state}_bytes")) for state in ('total', 'used', 'free')], unit='bytes')
+        # Semua mount jika field filesystems dikumpulkan, selain itu hanya root
+        disk = data.get('disk', {})
+        mounts = [mount for mount in data.get('filesystems', []) if 'total_bytes' in mount] or \
+            ([dict(disk, mountpoint='/')] if disk else [])
+        fs_labels = lambda mount: {'mountpoint': mount['mountpoint'], 'fstype': mount.get('fstype', '')}
+        family('filesystem_usage_percent', 'gauge', 'Penggunaan filesystem', [(fs_labels(m), m.get('percent')) for m in mounts])
+        family('filesystem_bytes', 'gauge', 'Kapasitas filesystem', [
+            (dict(fs_labels(m), state=state), m.get(f"{state}_bytes")) for m in mounts for state in ('total', 'used', 'free')], unit='bytes')
+        family('filesystem_inodes', 'gauge', 'Inode filesystem', [
+            (dict(fs_labels(m), state=state), m.get(f"inodes_{state}")) for m in mounts for state in ('total', 'used', 'free')])
+        family('filesystem_up', 'gauge', '1 jika probe mount terakhir berhasil tepat waktu', [
+            (fs_labels(m), int(m.get('status') == 'ok')) for m in data.get('filesystems', [])])
+
+        temperatures = [({'sensor': 'cpu'}, cpu.get('temperature')), ({'sensor': 'gpu'}, data.get('gpu', {}).get('temperature'))]
+        family('temperature_celsius', 'gauge', 'Suhu sensor', temperatures, unit='celsius')
+
+        # Counter mentah dari sampel yang sama dengan laju di /data
+        if 'disk_io' in data:
+            disks = {name: value for name, value in disk_rate_engine.last_counters().items() if name != TOTAL_KEY}
+            for field, name, unit in (('read_bytes', 'disk_read_bytes', 'bytes'), ('write_bytes', 'disk_written_bytes', 'bytes'),
+                                      ('read_count', 'disk_reads_completed', None), ('write_count', 'disk_writes_completed', None)):
+                family(name, 'counter', f"Counter disk {field}", [({'device': dev}, c[field]) for dev, c in sorted(disks.items())], unit=unit)
+        if 'network' in data:
+            nics = {name: value for name, value in net_rate_engine.last_counters().items() if name != TOTAL_KEY}
+            for field, name, unit in (('bytes_sent', 'network_transmit_bytes', 'bytes'), ('bytes_recv', 'network_receive_bytes', 'bytes'),
+                                      ('packets_sent', 'network_transmit_packets', None), ('packets_recv', 'network_receive_packets', None)):
+                family(name, 'counter', f"Counter network {field}", [({'interface': nic}, c[field]) for nic, c in sorted(nics.items())], unit=unit)
+
+        gpus = data.get('gpu', {}).get('gpus', [])
+        labels = lambda gpu: {'gpu': gpu.get('index', 0), 'name': gpu.get('name', 'N/A')}
+        family('gpu_utilization_percent', 'gauge', 'Utilisasi GPU', [(labels(gpu), gpu.get('usage')) for gpu in gpus])
+        family('gpu_memory_used_bytes', 'gauge', 'Memori GPU terpakai', [
+            (labels(gpu), gpu['mem_used'] * 1024 * 1024) for gpu in gpus if self._number(gpu.get('mem_used'))], unit='bytes')
+        family('gpu_memory_total_bytes', 'gauge', 'Memori GPU total', [
+            (labels(gpu), gpu['mem_total'] * 1024 * 1024) for gpu in gpus if self._number(gpu.get('mem_total'))], unit='bytes')
+        family('gpu_temperature_celsius', 'gauge', 'Suhu GPU', [(labels(gpu), gpu.get('temperature')) for gpu in gpus], unit='celsius')
+
+        battery = data.get('battery', {})
+        family('battery_percent', 'gauge', 'Kapasitas baterai', [(none, battery.get('percent'))])
+        if self._number(battery.get('percent')):
+            family('battery_plugged', 'gauge', '1 jika charger terpasang', [(none, int(bool(battery.get('plugged'))))])
+
+        uptime = data.get('system', {}).get('uptime', {})
+        if uptime.get('boot_timestamp'):
+            family('boot_time_seconds', 'gauge', 'Waktu boot sistem', [(none, uptime['boot_timestamp'])], unit='seconds')
+
+        processes = data.get('processes', [])
+        proc_labels = lambda proc: {'pid': proc['pid'], 'name': proc.get('name') or 'N/A'}
+        family('top_process_cpu_percent', 'gauge', 'CPU proses teratas', [(proc_labels(p), p.get('cpu_percent')) for p in processes])
+        family('top_process_memory_percent', 'gauge', 'Memori proses teratas', [(proc_labels(p), p.get('memory_percent')) for p in processes])
+
+        # Overhead monitor sendiri
+        with self_process.oneshot():
+            cpu_times = self_process.cpu_times()
+            rss = self_process.memory_info().rss
+        family('self_cpu_seconds', 'counter', 'Waktu CPU proses monitor', [(none, round(cpu_times.user + cpu_times.system, 3))], unit='seconds')
+        family('self_resident_memory_bytes', 'gauge', 'RSS proses monitor', [(none, rss)], unit='bytes')
+
+        lines.append('# EOF')
+        with self._rendered:
+            self._payload = (snapshot.seq, ('\n'.join(lines) + '\n').encode('utf-8'))
+            self._rendered.notify_all()
+
+    def payload(self):
+        return self._payload
+
+    # render() berjalan sebagai listener setelah snapshot dipublikasikan: tunggu payload untuk seq tersebut.
+    # Menunggu dalam potongan pendek karena di worker shared memory payload() diganti dan tidak pernah notify.
+    def wait_rendered(self, seq, timeout):
+        deadline = time.monotonic() + timeout
+        with self._rendered:
+            while True:
+                payload = self.payload()
+                remaining = deadline - time.monotonic()
+                if (payload is not None and payload[0] >= seq) or remaining <= 0:
+                    return payload
+                self._rendered.wait(min(remaining, 0.1))
+
+
+metrics_exporter = OpenMetricsExporter()
+sampler.add_listener(metrics_exporter.render)
+
+
+# Body yang sudah diencode beserta ETag-nya; versi gzip dibuat sekali saat pertama diminta
+class EncodedPayload:
+    GZIP_MIN_BYTES = 512 # Body lebih kecil dikirim apa adanya
+
+    def __init__(self, body, content_type='application/json'):
+        self.body = body
+        self.content_type = content_type
+        self.etag = hashlib.sha1(body).hexdigest()
+        self._gzip = None
+
+    def gzipped(self):
+        if self._gzip is None:
+            self._gzip = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzip
+
+    # Response untuk request aktif: gzip jika Accept-Encoding mengizinkan, 304 jika ETag cocok
+    def response(self):
+        use_gzip = len(self.body) >= self.GZIP_MIN_BYTES and request.accept_encodings['gzip'] > 0
+        response = Response(self.gzipped() if use_gzip else self.body, content_type=self.content_type)
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        response.set_etag(f"{self.etag}-gzip" if use_gzip else self.etag)
+        return response.make_conditional(request)
+
+
+# Cache payload per (seq snapshot, field): snapshot yang sama tidak pernah diencode dua kali
+class ResponseCache:
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build, content_type='application/json'):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = EncodedPayload(build(), content_type=content_type) # Di luar lock; encode ganda saat race tidak berbahaya
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+
+def encode_json(data):
+    return (app.json.dumps(data, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+response_cache = ResponseCache()
+
+
+@app.route('/data')
+def get_data():
+    # ?fields=cpu,ram,network membatasi section yang dikumpulkan dan dikirim
+    requested = request.args.get('fields')
+    if requested:
+        fields = tuple(dict.fromkeys(field.strip() for field in requested.split(',') if field.strip()))
+        unknown = [field for field in fields if field not in ALL_FIELDS and field not in SYSTEM_FIELDS]
+        if unknown or not fields:
+            return jsonify({'error': f"Field tidak dikenal: {', '.join(unknown)}",
+                            'fields': list(ALL_FIELDS + SYSTEM_FIELDS)}), 400
+    else:
+        fields = ALL_FIELDS
+
+    if field_demand.touch(fields):
+        sampler.request_sample()
+    # Thread dimulai saat request pertama agar proses reloader Flask tidak ikut sampling
+    sampler.start()
+    snapshot = sampler.latest(wait_timeout=5.0)
+    if snapshot is None:
+        return jsonify({'error': 'Data monitoring belum tersedia'}), 503
+    # Snapshot heartbeat dari masa idle: tunggu sampel segar yang baru dipicu
+    if time.time() - snapshot.timestamp > 2 * sampler.interval:
+        snapshot = sampler.wait_newer(snapshot.seq, sampler.interval + 1.0)
+    # Field yang baru diminta belum ada di snapshot lama: tunggu sampel berikutnya
+    deadline = time.monotonic() + 2 * sampler.interval + 1.0
+    while not all(snapshot_has_field(snapshot.data, field) for field in fields) and time.monotonic() < deadline:
+        snapshot = sampler.wait_newer(snapshot.seq, deadline - time.monotonic())
+
+    def build():
+        if requested:
+            return encode_json(select_fields(snapshot.data, fields))
+        # Worker shared memory: body sudah diencode oleh kolektor
+        return snapshot.body if snapshot.body is not None else encode_json(snapshot.data)
+
+    started = time.perf_counter()
+    payload = response_cache.get(('data', snapshot.seq, fields), build)
+    perf.observe('serialize.data', time.perf_counter() - started)
+    return payload.response()
+
+
+@app.route('/stream')
+def get_stream():
+    sampler.start()
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    try:
+        last_seq = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_seq = None
+    # ?format=compact: hanya metrik numerik riwayat sebagai array, skema dikirim sekali di awal
+    fmt = request.args.get('format', 'json')
+    if fmt not in StreamBroadcaster.FORMATS:
+        return jsonify({'error': f"format harus salah satu dari: {', '.join(StreamBroadcaster.FORMATS)}"}), 400
+
+    def stream():
+        # Dashboard stream butuh semua section selama masih terhubung
+        field_demand.touch(ALL_FIELDS)
+        for chunk in broadcaster.subscribe(last_seq, fmt):
+            field_demand.touch(ALL_FIELDS)
+            yield chunk
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no', # Matikan buffering di nginx
+    })
+
+
+@app.route('/processes')
+def get_processes():
+    sort = request.args.get('sort', 'cpu')
+    if sort not in ProcessTracker.SORT_KEYS:
+        return jsonify({'error': f"sort harus salah satu dari: {', '.join(ProcessTracker.SORT_KEYS)}"}), 400
+    group_by = request.args.get('group_by') or None
+    if group_by not in (None, 'name'):
+        return jsonify({'error': 'group_by hanya mendukung name'}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', '10')), 1000))
+    except ValueError:
+        return jsonify({'error': 'limit harus berupa angka'}), 400
+
+    # Tabel proses diperbarui oleh sampler selama field 'processes' diminta; 'processes.io' mengaktifkan laju I/O
+    if field_demand.touch(('processes', 'processes.io') if sort == 'io' else ('processes',)):
+        sampler.request_sample()
+    sampler.start()
+    snapshot = sampler.latest(wait_timeout=5.0)
+    if snapshot is not None and 'processes' not in snapshot.data:
+        sampler.wait_newer(snapshot.seq, 2 * sampler.interval + 1.0)
+
+    if shared_reader is not None:
+        # Worker: tabel proses ada di proses kolektor, yang tersedia hanya daftar teratas per urutan
+        table = shared_reader.extras.get('processes', {})
+        return jsonify({
+            'sort': sort,
+            'group_by': group_by,
+            'total': table.get('total', 0),
+            'processes': table.get('top', {}).get(f"{sort}:{group_by or ''}", [])[:limit],
+        })
+    return jsonify({
+        'sort': sort,
+        'group_by': group_by,
+        'total': len(process_tracker),
+        'processes': process_tracker.top(limit, sort=sort, group_by=group_by),
+    })
+
+
+# Mode agent: sampel dikirim ke aggregator dalam batch ringkas lewat satu koneksi HTTP keep-alive
+class AgentPusher:
+    def __init__(self, aggregator_url, host_id, push_interval=5.0, max_batch=900, token=None):
+        parsed = urllib.parse.urlsplit(aggregator_url)
+        self.scheme = parsed.scheme or 'http'
+        self.netloc = parsed.netloc
+        self.ingest_path = parsed.path.rstrip('/') + '/ingest'
+        self.host_id = host_id
+        self.push_interval = push_interval
+        self.token = token
+        self._samples = deque(maxlen=max_batch) # Saat aggregator tidak terjangkau, sampel tertua dibuang
+        self._latest = None
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stop = threading.Event()
+
+    # Listener sampler: hanya nilai numerik riwayat per sampel, data lengkap cukup yang terakhir
+    def record(self, snapshot):
+        values = history_values(snapshot.data)
+        row = [values.get(metric) for metric in MetricHistory.METRICS]
+        with self._lock:
+            self._samples.append([round(snapshot.timestamp, 3), row])
+            self._latest = snapshot.data
+
+    def _connection(self):
+        if self._conn is None:
+            conn_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            self._conn = conn_class(self.netloc, timeout=10)
+        return self._conn
+
+    def push_once(self):
+        with self._lock:
+            if not self._samples:
+                return 0
+            samples = list(self._samples)
+            latest = self._latest
+        payload = {
+            'host': self.host_id,
+            'metrics': list(MetricHistory.METRICS),
+            'samples': samples,
+            'latest': latest,
+        }
+        body = gzip.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+        headers = {'Content-Type': 'application/json', 'Content-Encoding': 'gzip', 'Connection': 'keep-alive'}
+        if self.token:
+            headers['X-Fleet-Token'] = self.token
+        try:
+            conn = self._connection()
+            conn.request('POST', self.ingest_path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read() # Kosongkan body agar koneksi bisa dipakai ulang
+        except (OSError, http.client.HTTPException) as e:
+            fleet_logger.warning("Gagal mengirim ke aggregator %s: %s", self.netloc, e)
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+            return 0
+        if response.status != 200:
+            fleet_logger.warning("Aggregator menolak batch: HTTP %s", response.status)
+            return 0
+        last_sent = samples[-1][0]
+        with self._lock:
+            # Buang hanya sampel yang sudah terkirim (menurut timestamp): jika deque penuh selama request,
+            # sampel terkirim yang tertua sudah tergeser dan sampel baru tidak boleh ikut terbuang
+            while self._samples and self._samples[0][0] <= last_sent:
+                self._samples.popleft()
+        return len(samples)
+
+    def run(self):
+        fleet_logger.info("Mode agent: host '%s' -> %s://%s%s", self.host_id, self.scheme, self.netloc, self.ingest_path)
+        while not self._stop.wait(self.push_interval):
+            # Agent selalu mengirim data lengkap, jadi semua section tetap dikumpulkan
+            field_demand.touch(ALL_FIELDS)
+            self.push_once()
+
+    def stop(self):
+        self._stop.set()
+
+
+# Mode aggregator: data terbaru dan riwayat ringkas per host
+class FleetRegistry:
+    def __init__(self, history_capacity=3600, offline_after=30.0):
+        self.history_capacity = history_capacity
+        self.offline_after = offline_after
+        self._hosts = {} # host id -> dict entry
+        self._lock = threading.Lock()
+
+    def _entry(self, host_id):
+        with self._lock:
+            entry = self._hosts.get(host_id)
+            if entry is None:
+                entry = {'history': MetricHistory(self.history_capacity), 'latest': None, 'last_seen': 0.0, 'samples': 0,
+                         'last_ts': float('-inf')}
+                self._hosts[host_id] = entry
+                fleet_logger.info("Host baru terdaftar di fleet: %s", host_id)
+            return entry
+
+    DICT_SECTIONS = ('cpu', 'ram', 'disk', 'gpu', 'network', 'disk_io', 'battery', 'stats', 'system')
+    LIST_SECTIONS = ('processes', 'filesystems')
+
+    # Periksa bentuk batch sebelum host didaftarkan; batch rusak tidak boleh membuat /fleet gagal
+    @classmethod
+    def validate(cls, payload):
+        if not isinstance(payload, dict):
+            raise ValueError('batch harus berupa object')
+        if not isinstance(payload.get('host'), str) or not payload['host'] or len(payload['host']) > 255:
+            raise ValueError('host harus berupa string 1-255 karakter')
+        metrics = payload.get('metrics', MetricHistory.METRICS)
+        if not isinstance(metrics, (list, tuple)) or not all(isinstance(metric, str) for metric in metrics):
+            raise ValueError('metrics harus berupa list string')
+        samples = payload.get('samples', [])
+        if not isinstance(samples, list):
+            raise ValueError('samples harus berupa list')
+        for sample in samples:
+            if not isinstance(sample, (list, tuple)) or len(sample) != 2:
+                raise ValueError('setiap sampel harus berupa [timestamp, nilai]')
+            timestamp, row = sample
+            if isinstance(timestamp, bool) or not isinstance(timestamp, (int, float)) or not math.isfinite(timestamp):
+                raise ValueError('timestamp sampel harus berupa angka')
+            if not isinstance(row, list) or len(row) != len(metrics) \
+                    or not all(value is None or (isinstance(value, (int, float)) and not isinstance(value, bool)) for value in row):
+                raise ValueError('nilai sampel harus berupa list angka sepanjang metrics')
+        latest = payload.get('latest')
+        if latest is not None:
+            if not isinstance(latest, dict):
+                raise ValueError('latest harus berupa object')
+            for section in cls.DICT_SECTIONS:
+                if section in latest and not isinstance(latest[section], dict):
+                    raise ValueError(f"latest.{section} harus berupa object")
+            for section in cls.LIST_SECTIONS:
+                if section in latest and not isinstance(latest[section], list):
+                    raise ValueError(f"latest.{section} harus berupa list")
+
+    def ingest(self, payload):
+        self.validate(payload)
+        host_id = payload['host']
+        metrics = payload.get('metrics', MetricHistory.METRICS)
+        entry = self._entry(host_id)
+        history_buffer = entry['history']
+        count = 0
+        with self._lock:
+            for timestamp, row in payload.get('samples', []):
+                timestamp = float(timestamp)
+                # Batch yang dikirim ulang atau duplikat dilewati: riwayat harus tetap urut waktu untuk searchsorted
+                if timestamp <= entry['last_ts']:
+                    continue
+                history_buffer.append(timestamp, dict(zip(metrics, row)))
+                entry['last_ts'] = timestamp
+                count += 1
+            if payload.get('latest') is not None:
+                entry['latest'] = payload['latest']
+            entry['last_seen'] = time.time()
+            entry['samples'] += count
+        return count
+
+    def host(self, host_id):
+        return self._hosts.get(host_id)
+
+    def overview(self):
+        now = time.time()
+        hosts = []
+        for host_id, entry in sorted(self._hosts.items()):
+            latest = entry['latest'] or {}
+            system = latest.get('system', {})
+            hosts.append({
+                'host': host_id,
+                'online': now - entry['last_seen'] < self.offline_after,
+                'last_seen': round(entry['last_seen'], 3),
+                'samples': entry['samples'],
+                'status': system.get('status', 'N/A'),
+                'status_details': system.get('status_details', []),
+                'cpu': latest.get('cpu', {}).get('percent'),
+                'ram': latest.get('ram', {}).get('percent'),
+                'disk': latest.get('disk', {}).get('percent'),
+                'gpu': latest.get('gpu', {}).get('usage'),
+            })
+        return hosts
+
+
+MONITOR_MODE = os.environ.get('MONITOR_MODE', 'standalone')
+FLEET_TOKEN = os.environ.get('MONITOR_FLEET_TOKEN') or None
+INGEST_MAX_BYTES = int(os.environ.get('MONITOR_INGEST_MAX_BYTES', str(16 * 1024 * 1024))) # Batas body setelah dekompresi
+app.config['MAX_CONTENT_LENGTH'] = INGEST_MAX_BYTES # Body mentah tidak pernah lebih besar dari hasil dekompresinya
+fleet = FleetRegistry()
+
+
+@app.route('/ingest', methods=['POST'])
+def ingest():
+    if MONITOR_MODE != 'aggregator':
+        return jsonify({'error': 'Server tidak berjalan dalam mode aggregator'}), 404
+    # Data dari agent ditampilkan di dashboard, jadi ingest tanpa token tidak pernah diterima
+    if FLEET_TOKEN is None:
+        return jsonify({'error': 'MONITOR_FLEET_TOKEN belum diset di aggregator'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Fleet-Token', ''), FLEET_TOKEN):
+        return jsonify({'error': 'Token fleet tidak valid'}), 403
+    try:
+        body = request.get_data()
+        if request.headers.get('Content-Encoding') == 'gzip':
+            # Dekompresi dibatasi agar body kecil tidak bisa mengembang menjadi ratusan MB
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            body = decompressor.decompress(body, INGEST_MAX_BYTES + 1)
+            if len(body) > INGEST_MAX_BYTES:
+                return jsonify({'error': f"Batch melebihi {INGEST_MAX_BYTES} byte setelah dekompresi"}), 413
+        payload = json.loads(body)
+        count = fleet.ingest(payload)
+    except (ValueError, KeyError, TypeError, zlib.error) as e:
+        return jsonify({'error': f"Batch tidak valid: {e}"}), 400
+    return jsonify({'accepted': count})
+
+
+@app.route('/fleet')
+def get_fleet():
+    return jsonify({'hosts': fleet.overview()})
+
+
+@app.route('/hosts/<host_id>/data')
+def get_host_data(host_id):
+    entry = fleet.host(host_id)
+    if entry is None or entry['latest'] is None:
+        return jsonify({'error': f"Host tidak dikenal: {host_id}"}), 404
+    data = entry['latest']
+    requested = request.args.get('fields')
+    if requested:
+        data = select_fields(data, [field.strip() for field in requested.split(',') if field.strip()])
+    response = jsonify(data)
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@app.route('/metrics')
+def get_metrics():
+    # Scraper butuh semua section; byte payload sudah dirender oleh sampler
+    if field_demand.touch(ALL_FIELDS):
+        sampler.request_sample()
+    sampler.start()
+    snapshot = sampler.latest(wait_timeout=5.0)
+    payload = metrics_exporter.payload()
+    if snapshot is not None and (payload is None or payload[0] < snapshot.seq):
+        payload = metrics_exporter.wait_rendered(snapshot.seq, timeout=2.0) or payload
+    if payload is None:
+        return Response('# EOF\n', status=503, mimetype='text/plain')
+    return response_cache.get(('metrics', payload[0]), lambda: payload[1], content_type=OpenMetricsExporter.CONTENT_TYPE).response()
+
+
+@app.route('/alerts')
+def get_alerts():
+    sampler.start()
+    try:
+        since = int(request.args.get('since', '0'))
+    except ValueError:
+        return jsonify({'error': 'since harus berupa angka'}), 400
+    if shared_reader is not None:
+        # Worker: state alert dievaluasi di proses kolektor
+        alerts = shared_reader.extras.get('alerts', {})
+        return jsonify({
+            'firing': alerts.get('firing', []),
+            'pending': alerts.get('pending', []),
+            'transitions': [item for item in alerts.get('transitions', []) if item['seq'] > since],
+        })
+    return jsonify({
+        'firing': alert_engine.active(('firing',)),
+        'pending': alert_engine.active(('pending',)),
+        'transitions': alert_engine.transitions(since),
+    })
+
+
+@app.route('/alerts/rules')
+def get_alert_rules():
+    return jsonify({'rules': [{key: value for key, value in rule.items() if not key.startswith('_')}
+                              for rule in alert_engine.rules]})
+
+
+HISTORY_BINARY_TYPE = 'application/vnd.monitor.history'
+
+
+# Format kolumnar ringkas untuk /history?format=binary (little-endian):
+# uint32 panjang header, header JSON (+ spasi sampai kelipatan 8 byte), float64[n] timestamp, float32[n] nilai (NaN = kosong)
+def encode_history_binary(header, timestamps, values):
+    meta = json.dumps(dict(header, count=len(timestamps)), separators=(',', ':')).encode('utf-8')
+    meta += b' ' * (-(4 + len(meta)) % 8)
+    return (struct.pack('<I', len(meta)) + meta + np.asarray(timestamps, dtype='<f8').tobytes()
+            + np.asarray(values, dtype='<f4').tobytes())
+
+
+@app.route('/history')
+def get_history():
+    sampler.start()
+    metric = request.args.get('metric', 'cpu')
+    if metric not in history.metrics:
+        return jsonify({'error': f"Metrik tidak dikenal: {metric}", 'metrics': list(history.metrics)}), 400
+    try:
+        start = float(request.args['from']) if 'from' in request.args else None
+        end = float(request.args['to']) if 'to' in request.args else None
+        points = int(request.args.get('points', '500'))
+    except ValueError:
+        return jsonify({'error': 'Parameter from/to/points harus berupa angka'}), 400
+    method = request.args.get('method', 'minmax')
+    if method not in DOWNSAMPLERS:
+        return jsonify({'error': f"Metode downsampling tidak dikenal: {method}"}), 400
+    fmt = request.args.get('format', 'json')
+    if fmt not in ('json', 'binary'):
+        return jsonify({'error': 'format harus json atau binary'}), 400
+
+    tier = request.args.get('tier', 'auto')
+    if tier not in ('auto', 'memory') and (store is None or tier not in store.TABLE_PREFIX):
+        return jsonify({'error': f"Tier tidak tersedia: {tier}"}), 400
+
+    # ?host= membaca riwayat host di fleet (mode aggregator), hanya tersedia di memori
+    history_buffer = history
+    host_id = request.args.get('host')
+    if host_id:
+        entry = fleet.host(host_id)
+        if entry is None:
+            return jsonify({'error': f"Host tidak dikenal: {host_id}"}), 404
+        history_buffer = entry['history']
+        tier = 'memory'
+
+    # Memori dipakai selama masih mencakup awal rentang; selebihnya dibaca dari store di disk
+    oldest = history_buffer.oldest()
+    use_memory = tier == 'memory' or (tier == 'auto' and (
+        store is None or start is None or (oldest is not None and start >= oldest)))
+    if use_memory:
+        timestamps, values = history_buffer.window(metric, start, end)
+        tier = 'memory'
+    else:
+        if start is None:
+            return jsonify({'error': 'Parameter from wajib untuk tier di disk'}), 400
+        result = store.query(metric, start, end, tier=tier)
+        timestamps, values, tier = result['timestamps'], result['values'], result['tier']
+    raw_count = len(values)
+    header = {'metric': metric, 'method': method, 'tier': tier, 'raw_points': raw_count}
+    # ?stats=1: statistik atas seluruh titik mentah di rentang (sebelum downsampling)
+    if request.args.get('stats') in ('1', 'true'):
+        header['stats'] = history_stats(timestamps, values)
+    if points > 0:
+        timestamps, values = DOWNSAMPLERS[method](timestamps, values, points)
+    if fmt == 'binary':
+        return EncodedPayload(encode_history_binary(header, timestamps, values), content_type=HISTORY_BINARY_TYPE).response()
+    # NaN tidak valid di JSON, kirim sebagai null
+    values = [None if v != v else round(v, 2) for v in values.tolist()]
+    return EncodedPayload(encode_json(dict(header, timestamps=[round(t, 3) for t in timestamps.tolist()],
+                                           values=values))).response()
+
+# Profiler on-demand: cProfile untuk N request berikutnya, atau sampling stack semua thread selama N request
+class RequestProfiler:
+    MODES = ('cprofile', 'sample')
+    MAX_DURATION = 120.0 # Capture sampling berhenti setelah ini walau N request belum tercapai
+
+    def __init__(self, sample_interval=0.005):
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+        self._capture_lock = threading.Lock() # cProfile: satu request sekaligus, sisanya tidak diprofil
+        self._mode = None
+        self._requested = 0
+        self._remaining = 0
+        self._started = None
+        self._profile = None
+        self._stacks = None
+        self._result = None # (nama file, mimetype, bytes)
+
+    def arm(self, requests, mode):
+        with self._lock:
+            if self._remaining:
+                return False
+            self._mode, self._requested, self._remaining = mode, requests, requests
+            self._started = time.time()
+            self._result = None
+            if mode == 'cprofile':
+                self._profile = cProfile.Profile()
+            else:
+                self._stacks = defaultdict(int)
+                threading.Thread(target=self._sample_stacks, name='perf-stack-sampler', daemon=True).start()
+            return True
+
+    # Awal request: mengembalikan objek cProfile yang sedang aktif, atau None
+    def begin(self):
+        if self._mode != 'cprofile' or not self._remaining:
+            return None
+        if not self._capture_lock.acquire(blocking=False):
+            return None
+        profile = self._profile
+        profile.enable()
+        return profile
+
+    def end(self, profile):
+        if profile is not None:
+            profile.disable()
+            self._capture_lock.release()
+        elif self._mode != 'sample':
+            return
+        with self._lock:
+            if not self._remaining:
+                return
+            self._remaining -= 1
+            if not self._remaining and self._mode == 'cprofile':
+                # Format .prof sama dengan Profile.dump_stats, bisa dibuka dengan pstats/snakeviz
+                profile.create_stats()
+                self._result = (f"monitor-{int(self._started)}.prof", 'application/octet-stream', marshal.dumps(profile.stats))
+
+    def _sample_stacks(self):
+        own = threading.get_ident()
+        while self._remaining and time.time() - self._started < self.MAX_DURATION:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self._stacks[';'.join(reversed(stack))] += 1
+            time.sleep(self.sample_interval)
+        # Format collapsed stack (flamegraph.pl, speedscope)
+        lines = [f"{stack} {count}" for stack, count in sorted(self._stacks.items())]
+        with self._lock:
+            self._remaining = 0
+            self._result = (f"monitor-{int(self._started)}.stacks.txt", 'text/plain', ('\n'.join(lines) + '\n').encode('utf-8'))
+
+    def status(self):
+        return {
+            'mode': self._mode,
+            'active': bool(self._remaining),
+            'requested': self._requested,
+            'remaining': self._remaining,
+            'started': self._started,
+            'ready': self._result is not None,
+        }
+
+    def result(self):
+        return self._result
+
+
+profiler = RequestProfiler()
+
+
+@app.before_request
+def _perf_before_request():
+    g.perf_started = time.perf_counter()
+    if not request.path.startswith('/debug/'):
+        g.perf_profile = profiler.begin()
+
+
+# teardown_request tetap dipanggil saat handler melempar exception
+@app.teardown_request
+def _perf_teardown_request(exc):
+    started = g.pop('perf_started', None)
+    if started is not None:
+        perf.observe(f"http.{request.endpoint or 'unknown'}", time.perf_counter() - started)
+    if 'perf_profile' in g:
+        profiler.end(g.pop('perf_profile'))
+
+
+def get_debug_perf():
+    with self_process.oneshot():
+        cpu_times = self_process.cpu_times()
+        memory = self_process.memory_info()
+        threads = self_process.num_threads()
+        created = self_process.create_time()
+    cpu_seconds = cpu_times.user + cpu_times.system
+    wall = max(time.time() - created, 1e-6)
+    snapshot = sampler.latest()
+    result = {
+        'process': {
+            'pid': self_process.pid,
+            'cpu_percent': self_process.cpu_percent(interval=None), # Sejak panggilan sebelumnya
+            'cpu_percent_avg': round(cpu_seconds / wall * 100, 2), # Rata-rata sejak proses dimulai
+            'cpu_seconds': round(cpu_seconds, 3),
+            'rss_bytes': memory.rss,
+            'threads': threads,
+            'uptime_seconds': round(wall, 1),
+        },
+        'sampler': {
+            'interval': sampler.interval,
+            'idle': getattr(sampler, 'idle', False),
+            'seq': snapshot.seq if snapshot else 0,
+        },
+        'timings': perf.summary(),
+        'logging': {
+            'queued': log_handler.queue.qsize(),
+            'dropped': log_handler.dropped,
+            'suppressed': sum(getattr(log_filter, 'suppressed', 0) for log_filter in log_handler.filters),
+        } if log_handler is not None else None, # Logging diatur oleh aplikasi yang mengimport modul ini
+        'profile': profiler.status(),
+    }
+    # ?reset=1 mengosongkan histogram setelah dibaca, untuk mengukur interval berikutnya
+    if request.args.get('reset') in ('1', 'true'):
+        perf.reset()
+    return jsonify(result)
+
+
+def debug_profile():
+    if request.method == 'POST':
+        mode = request.args.get('mode', 'cprofile')
+        if mode not in RequestProfiler.MODES:
+            return jsonify({'error': f"mode harus salah satu dari: {', '.join(RequestProfiler.MODES)}"}), 400
+        try:
+            requests_count = max(1, min(int(request.args.get('requests', '20')), 10000))
+        except ValueError:
+            return jsonify({'error': 'requests harus berupa angka'}), 400
+        if not profiler.arm(requests_count, mode):
+            return jsonify({'error': 'Profil lain masih berjalan', 'profile': profiler.status()}), 409
+        return jsonify(profiler.status()), 202
+
+    result = profiler.result()
+    if result is None:
+        status = profiler.status()
+        return jsonify(status), 202 if status['active'] else 404
+    filename, mimetype, payload = result
+    return Response(payload, mimetype=mimetype, headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+# Endpoint debug tidak berautentikasi (membuka info proses dan bisa memicu profiler), jadi hanya didaftarkan
+# jika diaktifkan eksplisit dengan MONITOR_DEBUG_PERF=1
+DEBUG_PERF = os.environ.get('MONITOR_DEBUG_PERF', '').lower() in ('1', 'true', 'yes')
+if DEBUG_PERF:
+    app.add_url_rule('/debug/perf', view_func=get_debug_perf)
+    app.add_url_rule('/debug/perf/profile', view_func=debug_profile, methods=['GET', 'POST'])
+
+
+# Segmen shared memory untuk mode serve: satu proses kolektor menulis, banyak worker membaca.
+# Layout: header, tabel slot, waktu permintaan per field (float64), lalu slot payload.
+# Setiap slot dilindungi seqlock: seq ganjil = sedang ditulis; pembaca mengulang jika seq berubah.
+class SharedSnapshotSegment:
+    MAGIC = b'WMSSHM02'
+    HEADER = struct.Struct('<8sII') # magic, jumlah field permintaan, jumlah slot
+    SLOT_ENTRY = struct.Struct('<16sQQ') # nama, offset, kapasitas
+    SEQ = struct.Struct('<Q')
+    META = struct.Struct('<Qd') # panjang payload, timestamp
+    SNAPSHOT_SEQ = struct.Struct('<Q') # Awalan slot data: seq snapshot, diikuti body /data
+    DEMAND = struct.Struct('<d')
+    SLOTS = (('data', 4 << 20), ('metrics', 1 << 20), ('alerts', 256 << 10), ('processes', 1 << 20))
+    PROCESS_LIMIT = 100 # Baris teratas per urutan yang dibagikan ke worker
+
+    def __init__(self, name=None, create=False, demand_fields=(), untrack=True):
+        self.demand_fields = tuple(demand_fields)
+        if create:
+            header_size = self.HEADER.size + self.SLOT_ENTRY.size * len(self.SLOTS)
+            demand_offset = header_size
+            offset = demand_offset + self.DEMAND.size * len(self.demand_fields)
+            entries = []
+            for slot, capacity in self.SLOTS:
+                entries.append((slot, offset, capacity))
+                offset += self.SEQ.size + self.META.size + capacity
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=offset)
+            buf = self._shm.buf
+            buf[:offset] = bytes(offset)
+            self.HEADER.pack_into(buf, 0, self.MAGIC, len(self.demand_fields), len(entries))
+            for index, (slot, slot_offset, capacity) in enumerate(entries):
+                self.SLOT_ENTRY.pack_into(buf, self.HEADER.size + index * self.SLOT_ENTRY.size,
+                                          slot.encode('ascii'), slot_offset, capacity)
+        else:
+            self._shm = self._attach(name, untrack)
+        self.name = self._shm.name
+        self.owner = create
+        self._buf = self._shm.buf
+        magic, demand_count, slot_count = self.HEADER.unpack_from(self._buf, 0)
+        if magic != self.MAGIC or demand_count != len(self.demand_fields):
+            raise ValueError(f"Segmen shared memory {self.name} tidak cocok dengan versi aplikasi ini")
+        self._slots = {}
+        for index in range(slot_count):
+            slot, slot_offset, capacity = self.SLOT_ENTRY.unpack_from(self._buf, self.HEADER.size + index * self.SLOT_ENTRY.size)
+            self._slots[slot.rstrip(b'\0').decode('ascii')] = (slot_offset, capacity)
+        self._demand_offset = self.HEADER.size + self.SLOT_ENTRY.size * slot_count
+
+    # untrack=False untuk worker mode serve (anak multiprocessing), yang berbagi resource tracker dengan kolektor
+    @staticmethod
+    def _attach(name, untrack):
+        try:
+            return shared_memory.SharedMemory(name=name, track=False) # Python 3.13+
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+            if untrack:
+                # Jangan biarkan resource tracker proses ini menghapus segmen milik kolektor saat keluar
+                resource_tracker.unregister(shm._name, 'shared_memory')
+            return shm
+
+    def write(self, slot, payload, timestamp):
+        offset, capacity = self._slots[slot]
+        if len(payload) > capacity:
+            logger.error("Payload %s (%d byte) melebihi kapasitas slot shared memory (%d byte)", slot, len(payload), capacity)
+            return False
+        seq = self.SEQ.unpack_from(self._buf, offset)[0]
+        self.SEQ.pack_into(self._buf, offset, seq + 1)
+        start = offset + self.SEQ.size + self.META.size
+        self._buf[start:start + len(payload)] = payload
+        self.META.pack_into(self._buf, offset + self.SEQ.size, len(payload), timestamp)
+        self.SEQ.pack_into(self._buf, offset, seq + 2)
+        return True
+
+    def slot_seq(self, slot):
+        return self.SEQ.unpack_from(self._buf, self._slots[slot][0])[0]
+
+    # (seq, timestamp, bytes) atau None jika belum pernah ditulis / tidak berubah sejak last_seq
+    def read(self, slot, last_seq=None, attempts=100):
+        offset = self._slots[slot][0]
+        start = offset + self.SEQ.size + self.META.size
+        for _ in range(attempts):
+            seq = self.SEQ.unpack_from(self._buf, offset)[0]
+            if seq == 0 or seq == last_seq:
+                return None # Tidak ada yang disalin selama slot tidak berubah
+            if seq % 2:
+                time.sleep(0)
+                continue
+            length, timestamp = self.META.unpack_from(self._buf, offset + self.SEQ.size)
+            payload = bytes(self._buf[start:start + length])
+            if self.SEQ.unpack_from(self._buf, offset)[0] == seq:
+                return seq, timestamp, payload
+        return None
+
+    def touch(self, fields):
+        now = time.time()
+        for field in fields:
+            if field in self.demand_fields:
+                self.DEMAND.pack_into(self._buf, self._demand_offset + self.demand_fields.index(field) * self.DEMAND.size, now)
+
+    def last_touch(self):
+        return max((self.DEMAND.unpack_from(self._buf, self._demand_offset + index * self.DEMAND.size)[0]
+                    for index in range(len(self.demand_fields))), default=0.0)
+
+    def recent(self, ttl):
+        now = time.time()
+        return [field for index, field in enumerate(self.demand_fields)
+                if now - self.DEMAND.unpack_from(self._buf, self._demand_offset + index * self.DEMAND.size)[0] < ttl]
+
+    # Listener sampler di proses kolektor: snapshot dan payload turunannya diencode sekali per sampel
+    # Slot data berisi byte /data apa adanya, sehingga worker bisa mengirimnya tanpa encode ulang
+    def publish(self, snapshot):
+        self.write('data', self.SNAPSHOT_SEQ.pack(snapshot.seq) + encode_json(snapshot.data), snapshot.timestamp)
+        payload = metrics_exporter.payload()
+        if payload is not None:
+            self.write('metrics', payload[1], snapshot.timestamp)
+        alerts = {
+            'firing': alert_engine.active(('firing',)),
+            'pending': alert_engine.active(('pending',)),
+            'transitions': alert_engine.transitions(0),
+        }
+        self.write('alerts', json.dumps(alerts, separators=(',', ':')).encode('utf-8'), snapshot.timestamp)
+        if 'processes' in snapshot.data:
+            top = {f"{sort}:{group_by or ''}": process_tracker.top(self.PROCESS_LIMIT, sort=sort, group_by=group_by)
+                   for sort in ProcessTracker.SORT_KEYS for group_by in (None, 'name')}
+            processes = {'total': len(process_tracker), 'top': top}
+            self.write('processes', json.dumps(processes, separators=(',', ':')).encode('utf-8'), snapshot.timestamp)
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# Pengganti sampler di proses worker: membaca snapshot dari shared memory dengan antarmuka yang sama
+class SharedSnapshotReader:
+    def __init__(self, segment, interval=1.0, poll_interval=0.05):
+        self.segment = segment
+        self.interval = interval
+        self.poll_interval = poll_interval
+        self.extras = {} # Payload turunan dari kolektor: 'alerts', 'processes'
+        self.metrics_payload = None # (seq, bytes) OpenMetrics
+        self._snapshot = None
+        self._slot_seqs = {}
+        self._ready = threading.Event()
+        self._published = threading.Condition()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._listeners = []
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='shared-snapshot-reader', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def request_sample(self):
+        pass # Field baru sampai ke kolektor lewat tabel permintaan di segmen
+
+    def _read_slot(self, slot):
+        result = self.segment.read(slot, self._slot_seqs.get(slot))
+        if result is not None:
+            self._slot_seqs[slot] = result[0]
+        return result
+
+    def poll(self):
+        result = self._read_slot('data')
+        if result is None:
+            return None
+        _, timestamp, payload = result
+        prefix = SharedSnapshotSegment.SNAPSHOT_SEQ
+        body = payload[prefix.size:]
+        snapshot = Snapshot(prefix.unpack_from(payload)[0], timestamp, json.loads(body), body)
+        metrics = self._read_slot('metrics')
+        if metrics is not None:
+            self.metrics_payload = (snapshot.seq, metrics[2])
+        for slot in ('alerts', 'processes'):
+            extra = self._read_slot(slot)
+            if extra is not None:
+                self.extras[slot] = json.loads(extra[2])
+        self._snapshot = snapshot
+        self._ready.set()
+        with self._published:
+            self._published.notify_all()
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception:
+                sampler_logger.exception("Error pada listener snapshot %s", getattr(listener, '__qualname__', listener))
+        return snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                sampler_logger.exception("Error saat membaca shared memory")
+            self._stop.wait(self.poll_interval)
+
+    def wait_newer(self, seq, timeout):
+        deadline = time.monotonic() + timeout
+        with self._published:
+            while self._snapshot is None or self._snapshot.seq <= seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._published.wait(remaining)
+        return self._snapshot
+
+    def latest(self, wait_timeout=None):
+        if self._snapshot is None and wait_timeout:
+            self.start()
+            self._ready.wait(wait_timeout)
+        return self._snapshot
+
+
+DEMAND_FIELDS = ALL_FIELDS + SYSTEM_FIELDS + ('processes.io',)
+shared_reader = None
+
+
+# Jadikan proses ini worker: snapshot, riwayat memori, stream dan /metrics dibaca dari segmen kolektor
+def attach_shared_worker(name, untrack=True):
+    global sampler, shared_reader
+    segment = SharedSnapshotSegment(name, demand_fields=DEMAND_FIELDS, untrack=untrack)
+    reader = SharedSnapshotReader(segment, interval=sampler.interval)
+    reader.add_listener(record_history)
+    reader.add_listener(broadcaster.publish)
+    field_demand.shared = segment
+    metrics_exporter.payload = lambda: reader.metrics_payload
+    sampler, shared_reader = reader, reader
+    logger.info("Worker %d membaca snapshot dari shared memory %s", os.getpid(), name)
+    return reader
+
+
+# Worker mode serve: menerima koneksi dari socket yang dibuka proses induk
+def run_shared_worker(name, listen_socket, host, port):
+    global log_handler
+    if log_handler is None:
+        log_handler = setup_logging()
+    # Worker memakai resource tracker yang sama dengan kolektor, jadi segmen tidak di-unregister
+    attach_shared_worker(name, untrack=False).start()
+    from werkzeug.serving import make_server
+    WSGIRequestHandler.protocol_version = 'HTTP/1.1'
+    server = make_server(host, port, app, threaded=True, fd=listen_socket.fileno())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+# Server WSGI lain (mis. gunicorn -w 4 app:app) menempel ke segmen kolektor lewat MONITOR_SHM_NAME
+# (__mp_main__ adalah app.py yang diimport ulang di worker mode serve; worker menempel sendiri)
+if __name__ not in ('__main__', '__mp_main__') and os.environ.get('MONITOR_SHM_NAME'):
+    attach_shared_worker(os.environ['MONITOR_SHM_NAME'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Web Monitoring Sistem')
+    parser.add_argument('--mode', choices=('standalone', 'agent', 'aggregator', 'serve', 'collector'), default=MONITOR_MODE)
+    parser.add_argument('--aggregator-url', default=os.environ.get('MONITOR_AGGREGATOR_URL'), help='URL aggregator (mode agent)')
+    parser.add_argument('--host-id', default=os.environ.get('MONITOR_HOST_ID', socket.gethostname()))
+    parser.add_argument('--push-interval', type=float, default=float(os.environ.get('MONITOR_PUSH_INTERVAL', '5.0')))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('MONITOR_PORT', '5000')))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('MONITOR_WORKERS', str(os.cpu_count() or 2))),
+                        help='Jumlah worker HTTP (mode serve)')
+    args = parser.parse_args()
+    MONITOR_MODE = args.mode
+    logger.info("Aplikasi monitoring dimulai (mode %s)", MONITOR_MODE)
+
+    if MONITOR_MODE == 'agent':
+        if not args.aggregator_url:
+            parser.error('--aggregator-url wajib untuk mode agent')
+        # Agent headless: tanpa server HTTP, hanya sampler dan pengirim batch
+        pusher = AgentPusher(args.aggregator_url, args.host_id, push_interval=args.push_interval, token=FLEET_TOKEN)
+        sampler.add_listener(pusher.record)
+        sampler.idle_interval = None # Aggregator selalu butuh sampel penuh
+        field_demand.touch(ALL_FIELDS)
+        sampler.start()
+        try:
+            pusher.run()
+        except KeyboardInterrupt:
+            pusher.stop()
+    elif MONITOR_MODE in ('serve', 'collector'):
+        # Satu proses kolektor menulis snapshot ke shared memory; mode serve juga menjalankan worker HTTP
+        # yang berbagi satu socket. Mode collector saja dipakai bersama server WSGI lain (MONITOR_SHM_NAME).
+        segment = SharedSnapshotSegment(os.environ.get('MONITOR_SHM_NAME') or f"wms-{os.getpid()}", create=True,
+                                        demand_fields=DEMAND_FIELDS)
+        field_demand.shared = segment
+        sampler.add_listener(segment.publish)
+        workers = {}
+        if MONITOR_MODE == 'serve':
+            listen_socket = socket.create_server(('0.0.0.0', args.port), backlog=128)
+            # Worker dijalankan sebagai proses baru (spawn), bukan fork: worker yang dijalankan ulang saat thread
+            # sampler sudah berjalan tidak boleh mewarisi lock yang sedang dipegang thread lain
+            context = multiprocessing.get_context('spawn')
+
+            def spawn_worker(worker_index):
+                worker = context.Process(target=run_shared_worker, name=f"monitor-worker-{worker_index}", daemon=True,
+                                         args=(segment.name, listen_socket, '0.0.0.0', args.port))
+                worker.start()
+                workers[worker_index] = worker
+
+            for worker_index in range(max(1, args.workers)):
+                spawn_worker(worker_index)
+            logger.info("Mode serve: %d worker di port %d, snapshot di shared memory %s", len(workers), args.port, segment.name)
+        else:
+            logger.info("Mode collector: snapshot di shared memory %s", segment.name)
+        # SIGTERM (systemd, docker stop) dihentikan seperti Ctrl+C agar worker dan segmen dibersihkan
+        def handle_sigterm(signum, frame):
+            raise KeyboardInterrupt
+
+        signal.signal(signal.SIGTERM, handle_sigterm)
+        sampler.start()
+        try:
+            while True:
+                time.sleep(1.0)
+                for worker_index, worker in list(workers.items()):
+                    if not worker.is_alive():
+                        logger.warning("Worker %s berhenti (kode %s), dijalankan ulang", worker.name, worker.exitcode)
+                        spawn_worker(worker_index)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            signal.signal(signal.SIGTERM, signal.SIG_IGN) # Sinyal berikutnya tidak memotong pembersihan
+            for worker in workers.values():
+                worker.terminate()
+            for worker in workers.values():
+                worker.join(timeout=5)
+            sampler.stop(timeout=5)
+            segment.close()
+    elif MONITOR_MODE == 'aggregator':
+        if FLEET_TOKEN is None:
+            parser.error('MONITOR_FLEET_TOKEN wajib diset untuk mode aggregator')
+        # HTTP/1.1 agar koneksi keep-alive dari agent bisa dipakai ulang
+        WSGIRequestHandler.protocol_version = 'HTTP/1.1'
+        app.run(host='0.0.0.0', port=args.port, threaded=True)
+    else:
+        # Nonaktifkan reloader Flask saat debug=True untuk menghindari reset global var state (opsional, tapi bisa membantu utk _prev_ vars)
+        # use_reloader=False penting saat debug variabel global
+        app.run(debug=True, host='0.0.0.0', port=args.port, use_reloader=False if os.environ.get("WERKZEUG_RUN_MAIN") == "true" else True)
\ No newline at end of file
@@ -0,0 +1,454 @@
+"""Benchmark jalur koleksi dan serving Web Monitoring Sistem.
+
+psutil, sysfs (hwmon) dan nvidia-smi diganti lapisan palsu yang deterministik sehingga
+hasil bisa dibandingkan antar versi. Contoh:
+
+    python benchmark.py --processes 10,1000,10000 --clients 1,8,32
+    python benchmark.py --compare benchmark_results/<versi-lama>.json
+"""
+import argparse
+import datetime
+import http.client
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager
+
+# Store di disk tidak ikut diukur; harus diset sebelum app diimport
+os.environ.setdefault('MONITOR_DB_PATH', '')
+os.environ.setdefault('MONITOR_SAMPLE_INTERVAL', '1.0')
+os.environ.setdefault('MONITOR_LOG_LEVELS', 'werkzeug=WARNING') # Log akses per request tidak ikut diukur
+
+import app as monitor  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_results')
+
+
+# Lapisan psutil palsu: hanya API yang dipakai app.py, nilai deterministik
+class FakePsutil:
+    POWER_TIME_UNLIMITED = -2
+    POWER_TIME_UNKNOWN = -1
+
+    class NoSuchProcess(Exception):
+        pass
+
+    class AccessDenied(Exception):
+        pass
+
+    class ZombieProcess(NoSuchProcess):
+        pass
+
+    svmem = namedtuple('svmem', ['total', 'available', 'percent', 'used', 'free'])
+    sdiskusage = namedtuple('sdiskusage', ['total', 'used', 'free', 'percent'])
+    sdiskio = namedtuple('sdiskio', ['read_count', 'write_count', 'read_bytes', 'write_bytes'])
+    snetio = namedtuple('snetio', ['bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv'])
+    pio = namedtuple('pio', ['read_bytes', 'write_bytes'])
+    sbattery = namedtuple('sbattery', ['percent', 'secsleft', 'power_plugged'])
+    shwtemp = namedtuple('shwtemp', ['label', 'current', 'high', 'critical'])
+    sdiskpart = namedtuple('sdiskpart', ['device', 'mountpoint', 'fstype', 'opts'])
+
+    def __init__(self, processes=100, disks=4, nics=4, churn=0.01, mounts=()):
+        self.process_count = processes
+        self.mounts = list(mounts) # (mountpoint, fstype); direktori sungguhan agar statvfs berhasil
+        self.disks = [f"sd{chr(ord('a') + i % 26)}{i // 26 or ''}" for i in range(disks)]
+        self.nics = [f"eth{i}" for i in range(nics)]
+        self.churn = churn # Fraksi PID yang diganti setiap panggilan pids()
+        self._tick = 0
+        self._next_pid = processes + 1
+        self._pids = list(range(1, processes + 1))
+        fake = self
+
+        class Process:
+            def __init__(self, pid):
+                self.pid = pid
+
+            @contextmanager
+            def oneshot(self):
+                yield
+
+            def name(self):
+                return f"proc-{self.pid % 97}"
+
+            def is_running(self):
+                return True
+
+            def cpu_percent(self, interval=None):
+                return float((self.pid * 7 + fake._tick) % 100)
+
+            def memory_percent(self):
+                return (self.pid % 50) / 10.0
+
+            def io_counters(self):
+                return fake.pio(self.pid * 1000 + fake._tick * 4096, self.pid * 500 + fake._tick * 2048)
+
+        self.Process = Process
+
+    def _advance(self):
+        self._tick += 1
+
+    def pids(self):
+        self._advance()
+        # Sebagian kecil proses keluar dan diganti PID baru, seperti host sungguhan
+        replace = int(len(self._pids) * self.churn)
+        if replace:
+            self._pids = self._pids[replace:] + list(range(self._next_pid, self._next_pid + replace))
+            self._next_pid += replace
+        return list(self._pids)
+
+    def cpu_percent(self, interval=None):
+        return float(20 + self._tick % 60)
+
+    def virtual_memory(self):
+        total = 16 * 1024 ** 3
+        used = int(total * (0.4 + (self._tick % 10) / 100))
+        return self.svmem(total, total - used, round(used / total * 100, 1), used, total - used)
+
+    def disk_usage(self, path):
+        total = 512 * 1024 ** 3
+        used = 300 * 1024 ** 3
+        return self.sdiskusage(total, used, total - used, round(used / total * 100, 1))
+
+    def disk_io_counters(self, perdisk=False):
+        base = self._tick * 1_000_000
+        counters = {name: self.sdiskio(base // 4096 + i, base // 8192 + i, base + i * 10_000, base // 2 + i * 5_000)
+                    for i, name in enumerate(self.disks)}
+        if perdisk:
+            return counters
+        return self.sdiskio(*(sum(values) for values in zip(*counters.values())))
+
+    def net_io_counters(self, pernic=False):
+        base = self._tick * 250_000
+        counters = {name: self.snetio(base + i * 1_000, base * 2 + i * 2_000, base // 1500 + i, base // 750 + i)
+                    for i, name in enumerate(self.nics)}
+        if pernic:
+            return counters
+        return self.snetio(*(sum(values) for values in zip(*counters.values())))
+
+    def disk_partitions(self, all=False):
+        # Ditambah mount semu yang harus diabaikan MountMonitor
+        parts = [self.sdiskpart(f"/dev/fake{i}", mountpoint, fstype, 'rw') for i, (mountpoint, fstype) in enumerate(self.mounts)]
+        return parts + [self.sdiskpart('proc', '/proc', 'proc', 'rw'), self.sdiskpart('tmpfs', '/run', 'tmpfs', 'rw')]
+
+    def sensors_temperatures(self):
+        return {'coretemp': [self.shwtemp('Package id 0', 55.0, 90.0, 100.0)]}
+
+    def sensors_battery(self):
+        return self.sbattery(80, 3600, False)
+
+    def boot_time(self):
+        return 1_700_000_000.0
+
+
+# Backend hwmon dengan pembacaan yang sengaja diperlambat (sensor I2C/ACPI yang lambat)
+class SlowHwmonBackend(monitor.HwmonTemperatureBackend):
+    def __init__(self, root, delay_ms=0.0, **kwargs):
+        super().__init__(root, **kwargs)
+        self.delay = delay_ms / 1000.0
+
+    def _read_fd(self, fd):
+        if self.delay:
+            time.sleep(self.delay)
+        return super()._read_fd(fd)
+
+
+# MountMonitor dengan probe mount jaringan yang sengaja diperlambat (NFS/CIFS yang lambat)
+class SlowMountMonitor(monitor.MountMonitor):
+    def __init__(self, delay_ms=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay_ms / 1000.0
+
+    def probe(self, mountpoint):
+        if self.delay and self._mounts.get(mountpoint, {}).get('network'):
+            time.sleep(self.delay)
+        return monitor.MountMonitor.probe(mountpoint)
+
+
+# Direktori mount palsu: beberapa mount lokal dan satu mount jaringan
+def make_fake_mounts(root, count=4):
+    mounts = []
+    for i in range(count):
+        fstype = 'nfs4' if i == count - 1 else 'ext4'
+        mountpoint = os.path.join(root, f"{fstype}-{i}")
+        os.makedirs(mountpoint, exist_ok=True)
+        mounts.append((mountpoint, fstype))
+    return mounts
+
+
+# Pohon /sys/class/hwmon palsu di direktori sementara
+def make_fake_hwmon(root):
+    chips = {
+        'hwmon0': {'name': 'coretemp', 'temp1_input': '55000', 'temp1_label': 'Package id 0', 'temp2_input': '52000', 'temp2_label': 'Core 0'},
+        'hwmon1': {'name': 'amdgpu', 'temp1_input': '61000'},
+        'hwmon2': {'name': 'acpitz', 'temp1_input': '40000'},
+    }
+    for chip, files in chips.items():
+        os.makedirs(os.path.join(root, chip), exist_ok=True)
+        for name, content in files.items():
+            with open(os.path.join(root, chip, name), 'w') as f:
+                f.write(content + '\n')
+    return root
+
+
+# Skrip nvidia-smi palsu yang meniru --loop-ms untuk sejumlah GPU
+def make_fake_nvidia_smi(directory, gpus=2):
+    path = os.path.join(directory, 'nvidia-smi')
+    lines = '\n'.join(f'  echo "{i}, Fake GPU {i}, {(i * 17) % 100}, 24576, {1024 * (i + 1)}, {24576 - 1024 * (i + 1)}, {50 + i}"'
+                      for i in range(gpus))
+    with open(path, 'w') as f:
+        f.write('#!/bin/sh\nwhile true; do\n' + lines + '\n  sleep 0.5\ndone\n')
+    os.chmod(path, 0o755)
+    return path
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(samples_ms):
+    return {
+        'p50_ms': round(percentile(samples_ms, 50), 4),
+        'p99_ms': round(percentile(samples_ms, 99), 4),
+        'mean_ms': round(statistics.fmean(samples_ms), 4) if samples_ms else 0.0,
+        'n': len(samples_ms),
+    }
+
+
+# Pasang lapisan palsu ke modul app dan reset state yang bergantung pada sampel sebelumnya
+def install_fakes(fake, hwmon_root, sensor_delay_ms, gpu_source, mount_delay_ms=0.0):
+    monitor.psutil = fake
+    # Interval 0: setiap putaran menjadwalkan probe baru, sehingga jalur probe ikut terukur
+    monitor.mount_monitor = SlowMountMonitor(delay_ms=mount_delay_ms, local_interval=0, network_interval=0)
+    monitor.disk_rate_engine = monitor.CounterRateEngine(monitor.disk_rate_engine.fields)
+    monitor.net_rate_engine = monitor.CounterRateEngine(monitor.net_rate_engine.fields)
+    monitor.process_tracker = monitor.ProcessTracker()
+    backend = SlowHwmonBackend(hwmon_root, delay_ms=sensor_delay_ms, ttl=0)
+    backend.probe()
+    monitor._hwmon_backend, monitor._hwmon_probed = backend, True
+    monitor._gpu_source, monitor._gpu_source_resolved = gpu_source, True
+
+
+# Latensi setiap collector dalam urutan dependensi, seperti yang dijalankan sampler
+def bench_collectors(rounds):
+    timings = {name: [] for name in monitor.resolve_collectors(monitor.ALL_FIELDS)}
+    for _ in range(rounds):
+        results = {}
+        for name in timings:
+            start = time.perf_counter()
+            results[name] = monitor.COLLECTORS[name][0](results)
+            timings[name].append((time.perf_counter() - start) * 1000)
+    return {name: summarize(samples) for name, samples in timings.items()}
+
+
+# /data end-to-end lewat server HTTP sungguhan dengan N client paralel (koneksi keep-alive)
+def bench_serving(clients, requests_per_client, path='/data'):
+    server = make_server('127.0.0.1', 0, monitor.app, threaded=True)
+    server.RequestHandlerClass.protocol_version = 'HTTP/1.1'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    port = server.server_port
+    latencies = []
+    lock = threading.Lock()
+    errors = []
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        try:
+            for _ in range(requests_per_client):
+                start = time.perf_counter()
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                local.append((time.perf_counter() - start) * 1000)
+                if response.status != 200:
+                    errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+        finally:
+            conn.close()
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=client) for _ in range(clients)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    thread.join()
+
+    result = summarize(latencies)
+    result['requests_per_sec'] = round(len(latencies) / elapsed, 1) if elapsed else 0.0
+    result['errors'] = len(errors)
+    return result
+
+
+# Alokasi memori per request /data (tracemalloc): puncak dan blok yang tersisa
+def bench_allocations(requests):
+    client = monitor.app.test_client()
+    client.get('/data') # Pemanasan: import lazy, cache template, dsb.
+    peaks = []
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(requests):
+        tracemalloc.reset_peak()
+        current_before, _ = tracemalloc.get_traced_memory()
+        client.get('/data')
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - current_before)
+    blocks_after = sys.getallocatedblocks()
+    tracemalloc.stop()
+    return {
+        'peak_kib_per_request': round(statistics.fmean(peaks) / 1024, 2),
+        'retained_blocks_per_request': round((blocks_after - blocks_before) / requests, 2),
+    }
+
+
+def git_version():
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(args):
+    tmp = tempfile.mkdtemp(prefix='monitor-bench-')
+    hwmon_root = make_fake_hwmon(os.path.join(tmp, 'hwmon'))
+    mounts = make_fake_mounts(os.path.join(tmp, 'mnt'), count=args.mounts)
+    make_fake_nvidia_smi(tmp, gpus=args.gpus)
+    gpu_source = monitor.NvidiaSmiStream(os.path.join(tmp, 'nvidia-smi'), loop_ms=500)
+    gpu_source.start()
+
+    scenarios = []
+    try:
+        for process_count in args.processes:
+            fake = FakePsutil(processes=process_count, disks=args.disks, nics=args.nics, mounts=mounts)
+            install_fakes(fake, hwmon_root, args.sensor_delay_ms, gpu_source, mount_delay_ms=args.mount_delay_ms)
+            print(f"== {process_count} proses, {args.disks} disk, {args.nics} NIC, {args.gpus} GPU, {args.mounts} mount", flush=True)
+
+            collectors = bench_collectors(args.rounds)
+            for name, stats in collectors.items():
+                print(f"  collector {name:<24} p50 {stats['p50_ms']:>9.3f} ms  p99 {stats['p99_ms']:>9.3f} ms")
+
+            # Sampler hanya hidup selama pengukuran /data, agar tidak berebut CPU dengan bench_collectors skenario berikutnya
+            monitor.field_demand.touch(monitor.ALL_FIELDS)
+            monitor.sampler.start()
+            try:
+                monitor.sampler.latest(wait_timeout=10)
+                serving = {}
+                for clients in args.clients:
+                    stats = bench_serving(clients, args.requests)
+                    serving[str(clients)] = stats
+                    print(f"  /data {clients:>3} client  p50 {stats['p50_ms']:>8.3f} ms  p99 {stats['p99_ms']:>8.3f} ms  "
+                          f"{stats['requests_per_sec']:>8.1f} req/s  error {stats['errors']}")
+
+                allocations = bench_allocations(args.requests)
+            finally:
+                monitor.sampler.stop(timeout=5)
+            print(f"  alokasi: {allocations['peak_kib_per_request']} KiB puncak/request, "
+                  f"{allocations['retained_blocks_per_request']} blok tersisa/request")
+            scenarios.append({
+                'processes': process_count,
+                'disks': args.disks,
+                'nics': args.nics,
+                'gpus': args.gpus,
+                'sensor_delay_ms': args.sensor_delay_ms,
+                'mounts': args.mounts,
+                'mount_delay_ms': args.mount_delay_ms,
+                'collectors': collectors,
+                'serving': serving,
+                'allocations': allocations,
+            })
+    finally:
+        gpu_source.stop()
+
+    return {
+        'version': git_version(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scenarios': scenarios,
+    }
+
+
+# Bandingkan p50 collector dan p99 serving terhadap hasil lama; regresi > threshold ditandai
+def compare(current, baseline_path, threshold):
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    old_scenarios = {scenario['processes']: scenario for scenario in baseline['scenarios']}
+    regressions = []
+    print(f"\nPerbandingan dengan {baseline.get('version', '?')} ({baseline_path}):")
+    for scenario in current['scenarios']:
+        old = old_scenarios.get(scenario['processes'])
+        if old is None:
+            continue
+        pairs = [(f"collector {name} p50", stats['p50_ms'], old['collectors'].get(name, {}).get('p50_ms'))
+                 for name, stats in scenario['collectors'].items()]
+        pairs += [(f"/data {clients} client p99", stats['p99_ms'], old['serving'].get(clients, {}).get('p99_ms'))
+                  for clients, stats in scenario['serving'].items()]
+        for label, new_value, old_value in pairs:
+            if not old_value:
+                continue
+            ratio = new_value / old_value
+            flag = ''
+            # Nilai sub-milidetik terlalu berisik untuk dinilai sebagai regresi
+            if ratio > 1 + threshold and new_value - old_value > 0.05:
+                flag = '  <-- REGRESI'
+                regressions.append((scenario['processes'], label, old_value, new_value))
+            print(f"  [{scenario['processes']:>6} proses] {label:<40} {old_value:>9.3f} -> {new_value:>9.3f} ms ({ratio:5.2f}x){flag}")
+    return regressions
+
+
+def parse_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark koleksi dan serving Web Monitoring Sistem')
+    parser.add_argument('--processes', type=parse_list, default=[10, 1000, 10000], help='Daftar jumlah proses, mis. 10,1000,10000')
+    parser.add_argument('--disks', type=int, default=8)
+    parser.add_argument('--nics', type=int, default=8)
+    parser.add_argument('--gpus', type=int, default=2)
+    parser.add_argument('--sensor-delay-ms', type=float, default=0.0, help='Simulasi sensor lambat per pembacaan')
+    parser.add_argument('--mounts', type=int, default=4, help='Jumlah mount palsu; yang terakhir mount jaringan')
+    parser.add_argument('--mount-delay-ms', type=float, default=50.0, help='Simulasi statvfs lambat pada mount jaringan')
+    parser.add_argument('--clients', type=parse_list, default=[1, 8, 32], help='Daftar jumlah client paralel')
+    parser.add_argument('--requests', type=int, default=200, help='Request per client')
+    parser.add_argument('--rounds', type=int, default=20, help='Putaran pengukuran per collector')
+    parser.add_argument('--output', help='File hasil JSON (default benchmark_results/<versi>.json)')
+    parser.add_argument('--compare', help='File hasil lama untuk dibandingkan')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Batas regresi relatif (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    results = run(args)
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['version']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nHasil disimpan ke {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regresi terdeteksi")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,8 @@
 let refreshInterval = 3000;
 let intervalId = null;
+let eventSource = null;
+let lastRenderTime = 0;
+let dataUrl = '/data'; // Berubah ke /hosts/<id>/data saat host fleet dipilih
 
 // Deklarasikan variabel chart instance di scope global
 let cpuChartInstance = null;
@@ -41,21 +44,25 @@ document.addEventListener('DOMContentLoaded', () => {
     // (Pengecekan instance chart akan ada di initCharts)
     setTimeout(() => {
         console.log("DOMContentLoaded: Memulai pemanggilan loadData periodik.");
-        loadData(); // Panggil loadData pertama kali
-        intervalId = setInterval(loadData, refreshInterval);
+        // Isi chart dari riwayat server dulu agar tidak mulai kosong setelah reload
+        preloadHistory().finally(startUpdates);
     }, 700); // Beri sedikit lebih banyak waktu jika ada proses render awal
 
     const intervalSelect = document.getElementById('intervalSelect');
     if (intervalSelect) {
         intervalSelect.addEventListener('change', () => {
             console.log("Interval diubah ke:", intervalSelect.value, "detik");
-            clearInterval(intervalId);
             refreshInterval = parseInt(intervalSelect.value) * 1000;
-            loadData(); // Langsung load data setelah interval diubah
-            intervalId = setInterval(loadData, refreshInterval);
+            // Saat streaming, interval hanya membatasi frekuensi render
+            if (intervalId !== null) {
+                stopPolling();
+                startPolling(); // Langsung load data setelah interval diubah
+            }
         });
     }
 
+    initHostSelect();
+
     document.querySelectorAll('#process-table th.sortable').forEach(header => {
         header.addEventListener('click', () => {
             const key = header.dataset.key;
@@ -156,6 +163,128 @@ function initCharts() {
     }
 }
 
+function preloadHistory() {
+    const charts = [
+        { metric: 'cpu', chart: cpuChartInstance },
+        { metric: 'ram', chart: ramChartInstance },
+        { metric: 'disk', chart: diskChartInstance },
+        { metric: 'gpu', chart: gpuChartInstance },
+    ];
+    const requests = charts.map(({ metric, chart }) => {
+        if (!chart) return Promise.resolve();
+        const points = chart.data.labels.length;
+        const from = Date.now() / 1000 - (points * refreshInterval) / 1000;
+        return fetch(`/history?metric=${metric}&points=${points}&from=${from}`)
+            .then(res => res.ok ? res.json() : null)
+            .then(result => {
+                if (!result || !Array.isArray(result.values) || result.values.length === 0) return;
+                const values = result.values.map(v => (v === null ? 0 : v)).slice(-points);
+                chart.data.datasets[0].data = Array(points - values.length).fill(0).concat(values);
+                chart.update('none');
+            })
+            .catch(err => console.warn(`preloadHistory: Gagal memuat riwayat '${metric}':`, err.message || err));
+    });
+    return Promise.all(requests);
+}
+
+// Pilihan host hanya muncul jika server ini aggregator dengan agent terdaftar
+function initHostSelect() {
+    const hostSelect = document.getElementById('hostSelect');
+    const label = document.getElementById('hostSelectLabel');
+    if (!hostSelect || !label) return;
+
+    fetch('/fleet')
+        .then(res => res.ok ? res.json() : null)
+        .then(result => {
+            if (!result || !Array.isArray(result.hosts) || result.hosts.length === 0) return;
+            result.hosts.forEach(host => {
+                const option = document.createElement('option');
+                option.value = host.host;
+                option.textContent = `${host.host}${host.online ? '' : ' (offline)'}`;
+                hostSelect.appendChild(option);
+            });
+            label.classList.remove('hidden');
+        })
+        .catch(err => console.warn("initHostSelect: Gagal memuat daftar fleet:", err.message || err));
+
+    hostSelect.addEventListener('change', () => {
+        const hostId = hostSelect.value;
+        console.log("Host diubah ke:", hostId || 'lokal');
+        stopPolling();
+        if (eventSource) {
+            eventSource.close();
+            eventSource = null;
+        }
+        if (hostId) {
+            // Data host fleet hanya tersedia lewat polling
+            dataUrl = `/hosts/${encodeURIComponent(hostId)}/data`;
+            startPolling();
+        } else {
+            dataUrl = '/data';
+            startUpdates();
+        }
+    });
+}
+
+// Utamakan server push (/stream); polling /data hanya sebagai fallback
+function startUpdates() {
+    if (typeof EventSource === 'undefined') {
+        console.warn("startUpdates: EventSource tidak didukung, memakai polling.");
+        startPolling();
+        return;
+    }
+    startStream();
+}
+
+function startPolling() {
+    if (intervalId !== null) return;
+    loadData(); // Panggil loadData pertama kali
+    intervalId = setInterval(loadData, refreshInterval);
+}
+
+function stopPolling() {
+    if (intervalId === null) return;
+    clearInterval(intervalId);
+    intervalId = null;
+}
+
+function startStream() {
+    const source = new EventSource('/stream');
+    eventSource = source;
+    source.addEventListener('sample', event => {
+        stopPolling(); // Stream (kembali) aktif, polling tidak diperlukan
+        const now = Date.now();
+        if (now - lastRenderTime < refreshInterval - 250) return; // Ikuti interval yang dipilih pengguna
+        lastRenderTime = now;
+        try {
+            renderData(JSON.parse(event.data));
+        } catch (e) {
+            console.error("startStream: Gagal memproses data stream:", e);
+        }
+    });
+    source.onerror = () => {
+        // EventSource reconnect sendiri dan melanjutkan dari Last-Event-ID; sementara itu pakai polling
+        console.warn("startStream: Koneksi stream terputus, beralih ke polling sementara.");
+        startPolling();
+        if (source.readyState === EventSource.CLOSED && eventSource === source) {
+            eventSource = null;
+        }
+    };
+}
+
+function renderData(data) {
+    const statusEl = document.getElementById('connection-status');
+    // console.log('renderData: Data diterima:', data); // Sangat berguna untuk debugging struktur data
+    updateCharts(data);
+    updateUI(data); // Panggil updateUI setelah chart diupdate
+    if (statusEl) {
+        statusEl.classList.remove('bg-blue-500', 'bg-red-500');
+        statusEl.classList.add('bg-green-500');
+        statusEl.textContent = 'Terhubung';
+        setTimeout(() => statusEl.classList.add('hidden'), 1500);
+    }
+}
+
 function loadData() {
     // console.log("loadData: Meminta data dari server..."); // Uncomment untuk debugging frekuensi
     const statusEl = document.getElementById('connection-status');
@@ -165,7 +294,7 @@ function loadData() {
         statusEl.textContent = 'Memuat data...';
     }
 
-    fetch('/data')
+    fetch(dataUrl)
         .then(res => {
             if (!res.ok) {
                 return res.text().then(text => { // Baca response sebagai teks dulu
@@ -179,17 +308,7 @@ function loadData() {
             }
             return res.json();
         })
-        .then(data => {
-            // console.log('loadData: Data diterima:', data); // Sangat berguna untuk debugging struktur data
-            updateCharts(data);
-            updateUI(data); // Panggil updateUI setelah chart diupdate
-            if (statusEl) {
-                statusEl.classList.remove('bg-blue-500', 'bg-red-500');
-                statusEl.classList.add('bg-green-500');
-                statusEl.textContent = 'Terhubung';
-                setTimeout(() => statusEl.classList.add('hidden'), 1500);
-            }
-        })
+        .then(renderData)
         .catch(err => {
             console.error("loadData: Gagal mengambil atau memproses data:", err.message || err);
             if (statusEl) {
@@ -346,9 +465,41 @@ function updateUI(data) {
     }
 
     if (data.processes) updateProcessTable(data.processes);
+    if (data.filesystems) updateFilesystemTable(data.filesystems);
     if (data.system) updateStatus(data);
 }
 
+function updateFilesystemTable(filesystems) {
+    const tbody = document.querySelector('#filesystem-table tbody');
+    if (!tbody) return;
+
+    if (filesystems.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="6" class="p-4 text-center text-gray-500">Tidak ada filesystem yang termonitor.</td></tr>';
+        return;
+    }
+    const safeToFixed = (val, precision = 1) => {
+        const num = parseFloat(val);
+        return isNaN(num) ? 'N/A' : num.toFixed(precision);
+    };
+    // Mount yang macet tetap ditampilkan dengan nilai terakhir yang berhasil dibaca
+    const statusClass = { ok: 'text-green-600', pending: 'text-gray-500', stalled: 'text-yellow-600', error: 'text-red-600', unavailable: 'text-red-600' };
+    tbody.innerHTML = filesystems.map(fs => `
+        <tr class="text-center">
+            <td class="px-4 py-2 text-left">${escapeHtml(fs.mountpoint)}</td>
+            <td class="px-4 py-2">${escapeHtml(fs.fstype)}</td>
+            <td class="px-4 py-2">${fs.total != null ? `${safeToFixed(fs.used)} / ${safeToFixed(fs.total)} GB` : 'N/A'}</td>
+            <td class="px-4 py-2">${safeToFixed(fs.percent)}%</td>
+            <td class="px-4 py-2">${fs.inodes_percent != null ? `${safeToFixed(fs.inodes_percent)}%` : 'N/A'}</td>
+            <td class="px-4 py-2 ${statusClass[fs.status] || ''}" title="${escapeHtml(fs.error)}">${escapeHtml(fs.status)}</td>
+        </tr>
+    `).join('');
+}
+
+// String dari server (bisa berasal dari agent fleet) di-escape sebelum masuk innerHTML
+function escapeHtml(value) {
+    return String(value ?? '').replace(/[&<>"']/g, ch => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' })[ch]);
+}
+
 function updateElement(id, text) {
     const el = document.getElementById(id);
     if (el) {
@@ -460,8 +611,8 @@ function updateProcessTable(processes) {
     processes.forEach(proc => {
         const row = `
             <tr class="text-center">
-                <td class="px-4 py-2">${proc.pid}</td>
-                <td class="px-4 py-2 text-left">${proc.name || 'N/A'}</td>
+                <td class="px-4 py-2">${escapeHtml(proc.pid)}</td>
+                <td class="px-4 py-2 text-left">${escapeHtml(proc.name || 'N/A')}</td>
                 <td class="px-4 py-2">${safeToFixed(proc.cpu_percent)}%</td>
                 <td class="px-4 py-2">${safeToFixed(proc.memory_percent)}%</td>
             </tr>
@@ -495,7 +646,7 @@ function updateStatus(data) {
         if (Array.isArray(data.system.recommendations) && data.system.recommendations.length > 0) {
             data.system.recommendations.forEach(r => {
                 list.innerHTML += `<li class="recommendation-item p-1 rounded bg-blue-50 text-xs">
-                    <i class="fas fa-circle-info text-blue-500 mr-1"></i> ${r}</li>`;
+                    <i class="fas fa-circle-info text-blue-500 mr-1"></i> ${escapeHtml(r)}</li>`;
             });
         } else {
              list.innerHTML += `<li class="recommendation-item p-1 rounded bg-blue-50 text-xs">
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Test tidak menulis store ke disk; harus diset sebelum app diimport
+os.environ.setdefault('MONITOR_DB_PATH', '')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,35 @@
+import json
+
+import app as monitor
+
+
+RULE = {'name': 'gpu_hot', 'metric': 'gpu.temperature', 'aggregate': 'avg', 'window': 30,
+        'threshold': 80, 'clear': 70, 'for': 0, 'severity': 'Kritis', 'detail': 'GPU Panas'}
+
+
+def test_invalid_rules_are_skipped(tmp_path):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps([
+        dict(RULE, name='bad_metric', metric=5),
+        dict(RULE, name='bad_severity', severity='Darurat'),
+        RULE,
+    ]))
+    engine = monitor.AlertEngine.from_config(str(path))
+    names = {rule['name'] for rule in engine.rules}
+    assert 'gpu_hot' in names
+    assert not names & {'bad_metric', 'bad_severity'}
+    engine.evaluate({'gpu': {'temperature': 50}}, now=1000.0)
+
+
+def test_alert_clears_when_metric_disappears():
+    engine = monitor.AlertEngine([RULE])
+    engine.evaluate({'gpu': {'temperature': 90}}, now=1000.0)
+    assert [alert['rule'] for alert in engine.active()] == ['gpu_hot']
+
+    # GPU hilang: nilai lama masih di dalam jendela 30 detik
+    engine.evaluate({'gpu': {'temperature': None}}, now=1010.0)
+    assert engine.active()
+
+    engine.evaluate({'gpu': {'temperature': None}}, now=1031.0)
+    assert engine.active() == []
+    assert engine.transitions()[-1]['to'] == 'inactive'
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+import app as monitor
+
+TOKEN = 'rahasia'
+
+
+def snapshot(seq, timestamp, cpu, status='Normal'):
+    data = {
+        'cpu': {'percent': cpu, 'temperature': 'N/A'},
+        'ram': {'percent': 40.0},
+        'disk': {'percent': 50.0},
+        'gpu': {'usage': 0.0},
+        'network': {'upload_bps': 100.0, 'download_bps': 200.0},
+        'disk_io': {'read': 1.0, 'write': 2.0},
+        'processes': [{'pid': 1, 'name': '<b>init</b>', 'cpu_percent': 0.0, 'memory_percent': 0.1}],
+        'system': {'status': status, 'status_details': []},
+    }
+    return monitor.Snapshot(seq, timestamp, data)
+
+
+@pytest.fixture
+def aggregator(monkeypatch):
+    monkeypatch.setattr(monitor, 'MONITOR_MODE', 'aggregator')
+    monkeypatch.setattr(monitor, 'FLEET_TOKEN', TOKEN)
+    monkeypatch.setattr(monitor, 'fleet', monitor.FleetRegistry())
+
+
+# Aggregator sungguhan di localhost untuk AgentPusher
+@pytest.fixture
+def aggregator_url(aggregator):
+    server = make_server('127.0.0.1', 0, monitor.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_two_agents_push_to_aggregator(aggregator_url):
+    agents = {host: monitor.AgentPusher(aggregator_url, host, token=TOKEN) for host in ('web-01', 'db-01')}
+    for offset, (host, pusher) in enumerate(agents.items()):
+        for seq in range(1, 4):
+            pusher.record(snapshot(seq, 1000.0 + seq, cpu=10.0 * (offset + 1) + seq, status='Beban Tinggi' if offset else 'Normal'))
+        assert pusher.push_once() == 3
+        assert pusher.push_once() == 0 # Sampel terkirim sudah dibuang
+
+    client = monitor.app.test_client()
+    hosts = {host['host']: host for host in client.get('/fleet').get_json()['hosts']}
+    assert set(hosts) == {'web-01', 'db-01'}
+    assert hosts['web-01']['online'] and hosts['web-01']['samples'] == 3
+    assert hosts['web-01']['cpu'] == 13.0
+    assert hosts['db-01']['status'] == 'Beban Tinggi'
+
+    data = client.get('/hosts/db-01/data').get_json()
+    assert data['cpu']['percent'] == 23.0
+    assert client.get('/hosts/db-01/data?fields=ram').get_json() == {'ram': {'percent': 40.0}}
+    assert client.get('/hosts/unknown/data').status_code == 404
+
+    history = client.get('/history?host=web-01&metric=cpu').get_json()
+    assert [round(value, 1) for value in history['values']] == [11.0, 12.0, 13.0]
+
+
+def test_retried_batch_is_not_duplicated(aggregator_url):
+    pusher = monitor.AgentPusher(aggregator_url, 'web-01', token=TOKEN)
+    pusher.record(snapshot(1, 1000.0, cpu=5.0))
+    samples = list(pusher._samples)
+    assert pusher.push_once() == 1
+    pusher._samples.extend(samples) # Batch yang sama dikirim ulang
+    pusher.record(snapshot(2, 1001.0, cpu=6.0))
+    assert pusher.push_once() == 2
+    assert monitor.fleet.host('web-01')['samples'] == 2
+
+
+@pytest.mark.parametrize('payload', [
+    {'host': 'bad', 'latest': []},
+    {'host': 'bad', 'latest': 'x'},
+    {'host': 'bad', 'latest': {'system': []}},
+    {'host': 'bad', 'samples': [['t', [1.0]]]},
+    {'host': 'bad', 'metrics': ['cpu'], 'samples': [[1.0, [1.0, 2.0]]]},
+    {'host': 5},
+    [],
+])
+def test_malformed_batch_is_rejected(aggregator, payload):
+    client = monitor.app.test_client()
+    response = client.post('/ingest', json=payload, headers={'X-Fleet-Token': TOKEN})
+    assert response.status_code == 400
+    assert monitor.fleet.host('bad') is None
+    assert client.get('/fleet').status_code == 200
+
+
+def test_ingest_requires_token(aggregator):
+    client = monitor.app.test_client()
+    assert client.post('/ingest', json={'host': 'x'}).status_code == 403
+    assert client.post('/ingest', json={'host': 'x'}, headers={'X-Fleet-Token': 'salah'}).status_code == 403
@@ -0,0 +1,115 @@
+import os
+import time
+
+import pytest
+
+import app as monitor
+from benchmark import make_fake_nvidia_smi
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content + '\n')
+
+
+@pytest.fixture
+def stream_factory():
+    streams = []
+
+    def make(binary, **kwargs):
+        stream = monitor.NvidiaSmiStream(binary, loop_ms=100, **kwargs)
+        streams.append(stream)
+        return stream
+    yield make
+    for stream in streams:
+        stream.stop()
+
+
+def test_parse_line():
+    stream = monitor.NvidiaSmiStream('nvidia-smi')
+    index, info = stream.parse_line('1, Fake GPU 1, 17, 24576, 2048, 22528, 51\n')
+    assert index == 1
+    assert info == {'name': 'Fake GPU 1', 'usage': 17.0, 'mem_total': 24576.0, 'mem_used': 2048.0,
+                    'mem_free': 22528.0, 'temperature': 51.0}
+
+
+def test_parse_line_handles_missing_values():
+    stream = monitor.NvidiaSmiStream('nvidia-smi')
+    _, info = stream.parse_line('0, Fake GPU, [N/A], 8192, 1024, [N/A], [N/A]')
+    assert info['usage'] == 0.0
+    assert info['mem_free'] == 7168.0
+    assert info['temperature'] == 'N/A'
+    assert stream.parse_line('index, name, utilization.gpu') is None
+    assert stream.parse_line('NVIDIA-SMI has failed') is None
+
+
+def test_stream_reads_fake_nvidia_smi_on_path(tmp_path, monkeypatch, stream_factory):
+    make_fake_nvidia_smi(str(tmp_path), gpus=2)
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ.get('PATH', ''))
+    binary = monitor.find_nvidia_smi()
+    assert binary == str(tmp_path / 'nvidia-smi')
+
+    stream = stream_factory(binary)
+    stream.start()
+    assert wait_for(lambda: len(stream.latest()) == 2)
+    gpus = stream.latest()
+    assert [gpu['index'] for gpu in gpus] == [0, 1]
+    assert gpus[1]['name'] == 'Fake GPU 1'
+    assert gpus[1]['mem_used'] == 2048.0
+
+
+def test_stream_restarts_after_exit(tmp_path, stream_factory):
+    runs = tmp_path / 'runs'
+    script = tmp_path / 'nvidia-smi'
+    # Mencetak satu baris lalu keluar, seperti nvidia-smi yang crash
+    script.write_text(f'#!/bin/sh\necho run >> {runs}\necho "0, Fake GPU 0, 5, 8192, 1024, 7168, 40"\nsleep 0.2\n')
+    script.chmod(0o755)
+
+    stream = stream_factory(str(script), restart_delay=0.05)
+    stream.start()
+    assert wait_for(lambda: runs.exists() and len(runs.read_text().split()) >= 3)
+    assert wait_for(lambda: stream.latest() and stream.latest()[0]['usage'] == 5.0)
+
+
+def test_amd_sysfs_source(tmp_path):
+    drm = tmp_path / 'drm'
+    amd = drm / 'card0' / 'device'
+    write(str(amd / 'vendor'), '0x1002')
+    write(str(amd / 'gpu_busy_percent'), '37')
+    write(str(amd / 'mem_info_vram_total'), str(8 * 1024 ** 3))
+    write(str(amd / 'mem_info_vram_used'), str(1024 ** 3))
+    write(str(amd / 'hwmon' / 'hwmon4' / 'temp1_input'), '65000')
+    write(str(drm / 'card1' / 'device' / 'vendor'), '0x10de')
+    os.makedirs(drm / 'card0-DP-1')
+
+    source = monitor.AmdSysfsGpuSource(str(drm))
+    try:
+        assert source.probe()
+        (gpu,) = source.latest()
+        assert gpu['name'] == 'AMD GPU (card0)'
+        assert gpu['usage'] == 37.0
+        assert gpu['mem_total'] == 8192.0
+        assert gpu['mem_used'] == 1024.0
+        assert gpu['mem_free'] == 7168.0
+        assert gpu['temperature'] == 65.0
+
+        write(str(amd / 'gpu_busy_percent'), '80')
+        assert source.latest()[0]['usage'] == 80.0
+    finally:
+        source.close()
+
+
+def test_amd_sysfs_source_without_amd_cards(tmp_path):
+    write(str(tmp_path / 'card0' / 'device' / 'vendor'), '0x8086')
+    assert not monitor.AmdSysfsGpuSource(str(tmp_path)).probe()
+    assert not monitor.AmdSysfsGpuSource(str(tmp_path / 'missing')).probe()
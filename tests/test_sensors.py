@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+import app as monitor
+from benchmark import make_fake_hwmon
+
+
+def write(path, content):
+    with open(path, 'w') as f:
+        f.write(content + '\n')
+
+
+@pytest.fixture
+def hwmon_root(tmp_path):
+    return make_fake_hwmon(str(tmp_path / 'hwmon'))
+
+
+@pytest.fixture
+def backend(hwmon_root):
+    backend = monitor.HwmonTemperatureBackend(hwmon_root, ttl=0)
+    yield backend
+    backend.close()
+
+
+def test_probe_classifies_cpu_and_gpu_chips(backend):
+    assert backend.probe()
+    assert len(backend._cpu_fds) == 2 # acpitz tidak dikenali sebagai CPU/GPU
+    assert backend.read() == (55.0, 61.0)
+
+
+def test_package_sensor_wins_over_core(hwmon_root, backend):
+    chip = os.path.join(hwmon_root, 'hwmon0')
+    write(os.path.join(chip, 'temp1_label'), 'Core 0')
+    write(os.path.join(chip, 'temp1_input'), '48000')
+    write(os.path.join(chip, 'temp2_label'), 'Package id 0')
+    write(os.path.join(chip, 'temp2_input'), '71000')
+    backend.probe()
+    assert backend.read()[0] == 71.0
+
+
+def test_read_is_cached_for_ttl(hwmon_root):
+    backend = monitor.HwmonTemperatureBackend(hwmon_root, ttl=60)
+    try:
+        backend.probe()
+        assert backend.read()[0] == 55.0
+        write(os.path.join(hwmon_root, 'hwmon0', 'temp1_input'), '90000')
+        assert backend.read()[0] == 55.0
+        backend.ttl = 0
+        assert backend.read()[0] == 90.0
+    finally:
+        backend.close()
+
+
+def test_unreadable_input_falls_back_to_next_sensor(hwmon_root, backend):
+    backend.probe()
+    write(os.path.join(hwmon_root, 'hwmon0', 'temp1_input'), 'garbage')
+    assert backend.read()[0] == 52.0
+    write(os.path.join(hwmon_root, 'hwmon0', 'temp2_input'), '')
+    write(os.path.join(hwmon_root, 'hwmon1', 'temp1_input'), 'garbage')
+    assert backend.read() == ('N/A', 'N/A')
+
+
+def test_probe_without_sensors(tmp_path):
+    assert not monitor.HwmonTemperatureBackend(str(tmp_path / 'missing')).probe()
+    os.makedirs(tmp_path / 'hwmon' / 'hwmon0')
+    write(str(tmp_path / 'hwmon' / 'hwmon0' / 'name'), 'acpitz')
+    assert not monitor.HwmonTemperatureBackend(str(tmp_path / 'hwmon')).probe()
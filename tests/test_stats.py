@@ -0,0 +1,29 @@
+import pytest
+
+import app as monitor
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(monitor, 'store', None) # Tanpa seed dari riwayat di disk
+    return monitor.StreamingStats(monitor.MetricHistory.METRICS, warmup=30)
+
+
+# Disk naik 0.1 poin setiap 30 menit (sampel setiap 10 detik): di antara langkah deret datar dan varian
+# EWMA meluruh ke ~0, sehingga langkah resolusi berikutnya tidak boleh dianggap anomali
+def test_flat_then_step_is_not_an_anomaly(engine):
+    flagged = []
+    for index in range(180 * 8 + 1):
+        gpu = 1.0 if index in (180 * 4, 180 * 8) else 0.0 # Kedipan 1% GPU setelah lama idle
+        result = engine.update(1000.0 + 10 * index, {'disk': {'percent': 50.0 + 0.1 * (index // 180)},
+                                                     'gpu': {'usage': gpu}})
+        flagged.extend(result['anomalies'])
+    assert flagged == []
+    assert abs(result['metrics']['disk']['z']) < 1
+
+
+def test_large_step_after_flat_series_is_an_anomaly(engine):
+    for index in range(600):
+        engine.update(1000.0 + index, {'disk': {'percent': 50.0}, 'gpu': {'usage': 0.0}})
+    result = engine.update(1600.0, {'disk': {'percent': 50.0}, 'gpu': {'usage': 80.0}})
+    assert result['anomalies'] == ['gpu']